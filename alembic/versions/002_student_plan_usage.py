@@ -0,0 +1,43 @@
+"""Student plan usage counters
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Create student_plan_usage table
+    op.create_table('student_plan_usage',
+        sa.Column('student_plan_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('access_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['student_plan_id'], ['student_plans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_plan_id', 'year', 'month')
+    )
+
+    # Backfill the counters from the existing access history
+    op.execute("""
+        INSERT INTO student_plan_usage (student_plan_id, year, month, access_count, updated_at)
+        SELECT student_plan_id,
+               CAST(EXTRACT(YEAR FROM access_time) AS INTEGER),
+               CAST(EXTRACT(MONTH FROM access_time) AS INTEGER),
+               COUNT(*),
+               now()
+        FROM access_logs
+        WHERE access_time IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+def downgrade() -> None:
+    op.drop_table('student_plan_usage')
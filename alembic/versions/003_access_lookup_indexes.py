@@ -0,0 +1,42 @@
+"""Indexes for access log and student plan lookups
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction, and it
+    # keeps access_logs writable while the indexes are built
+    with op.get_context().autocommit_block():
+        op.create_index('ix_student_plans_active_lookup', 'student_plans',
+                        ['student_id', 'start_date', 'end_date'],
+                        postgresql_where=sa.text('is_active'), postgresql_concurrently=True)
+        op.create_index('ix_student_plans_active_end_date', 'student_plans', ['end_date'],
+                        postgresql_where=sa.text('is_active'), postgresql_concurrently=True)
+        op.create_index('ix_student_plans_plan_id', 'student_plans', ['plan_id'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_access_logs_student_time', 'access_logs', ['student_id', 'access_time'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_access_logs_student_plan_time', 'access_logs', ['student_plan_id', 'access_time'],
+                        postgresql_concurrently=True)
+        op.create_index('ix_access_logs_access_time', 'access_logs', ['access_time'],
+                        postgresql_concurrently=True)
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_access_logs_access_time', table_name='access_logs', postgresql_concurrently=True)
+        op.drop_index('ix_access_logs_student_plan_time', table_name='access_logs', postgresql_concurrently=True)
+        op.drop_index('ix_access_logs_student_time', table_name='access_logs', postgresql_concurrently=True)
+        op.drop_index('ix_student_plans_plan_id', table_name='student_plans', postgresql_concurrently=True)
+        op.drop_index('ix_student_plans_active_end_date', table_name='student_plans', postgresql_concurrently=True)
+        op.drop_index('ix_student_plans_active_lookup', table_name='student_plans', postgresql_concurrently=True)
@@ -0,0 +1,48 @@
+"""Hourly access rollup
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Create access_stats_hourly table
+    op.create_table('access_stats_hourly',
+        sa.Column('plan_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('hour', sa.Integer(), nullable=False),
+        sa.Column('access_count', sa.Integer(), nullable=False),
+        sa.Column('student_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['plan_id'], ['plans.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('plan_id', 'day', 'hour')
+    )
+    op.create_index('ix_access_stats_hourly_day', 'access_stats_hourly', ['day'])
+
+    # Backfill the rollup from the existing access history
+    op.execute("""
+        INSERT INTO access_stats_hourly (plan_id, day, hour, access_count, student_count, updated_at)
+        SELECT sp.plan_id,
+               CAST(al.access_time AS DATE),
+               CAST(EXTRACT(HOUR FROM al.access_time) AS INTEGER),
+               COUNT(*),
+               COUNT(DISTINCT al.student_id),
+               now()
+        FROM access_logs al
+        JOIN student_plans sp ON sp.id = al.student_plan_id
+        WHERE al.access_time IS NOT NULL
+        GROUP BY 1, 2, 3
+    """)
+
+def downgrade() -> None:
+    op.drop_index('ix_access_stats_hourly_day', table_name='access_stats_hourly')
+    op.drop_table('access_stats_hourly')
@@ -0,0 +1,107 @@
+"""Partition access_logs by access_time month
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# Partitions created ahead of the current month; the app keeps this
+# window filled afterwards (PARTITION_MONTHS_AHEAD)
+MONTHS_AHEAD = 3
+
+INDEXES = """
+    CREATE INDEX ix_access_logs_id ON access_logs (id);
+    CREATE INDEX ix_access_logs_student_time ON access_logs (student_id, access_time);
+    CREATE INDEX ix_access_logs_student_plan_time ON access_logs (student_plan_id, access_time);
+    CREATE INDEX ix_access_logs_access_time ON access_logs (access_time);
+"""
+
+def upgrade() -> None:
+    # Creates the partition holding `month_start` unless it exists; returns
+    # its name when it was created. Partitions are named access_logs_yYYYYmMM.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION access_logs_ensure_partition(month_start date) RETURNS text AS $$
+        DECLARE
+            start_at date := date_trunc('month', month_start)::date;
+            partition_name text := format('access_logs_y%sm%s', to_char(start_at, 'YYYY'), to_char(start_at, 'MM'));
+        BEGIN
+            IF to_regclass(partition_name) IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF access_logs FOR VALUES FROM (%L) TO (%L)',
+                partition_name, start_at, (start_at + interval '1 month')::date
+            );
+            RETURN partition_name;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # The partition key has to be part of the primary key and cannot be
+    # NULL; rows without a time (never written by the app) get the
+    # migration time
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_old")
+    op.execute("ALTER TABLE access_logs_old RENAME CONSTRAINT access_logs_pkey TO access_logs_old_pkey")
+    op.execute("UPDATE access_logs_old SET access_time = now() WHERE access_time IS NULL")
+    # Keep the id sequence alive when the old table is dropped
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+
+    op.execute("""
+        CREATE TABLE access_logs (
+            id integer NOT NULL DEFAULT nextval('access_logs_id_seq'),
+            student_id integer NOT NULL REFERENCES students (id),
+            student_plan_id integer NOT NULL REFERENCES student_plans (id),
+            access_time timestamp without time zone NOT NULL DEFAULT now(),
+            notes text,
+            PRIMARY KEY (id, access_time)
+        ) PARTITION BY RANGE (access_time)
+    """)
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+
+    op.execute(f"""
+        SELECT access_logs_ensure_partition(month::date)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT min(access_time) FROM access_logs_old), now())),
+            date_trunc('month', now()) + interval '{MONTHS_AHEAD} months',
+            interval '1 month'
+        ) AS month
+    """)
+
+    # Copy, then build the indexes on the loaded partitions
+    op.execute("""
+        INSERT INTO access_logs (id, student_id, student_plan_id, access_time, notes)
+        SELECT id, student_id, student_plan_id, access_time, notes FROM access_logs_old
+    """)
+    op.execute("DROP TABLE access_logs_old")
+    op.execute(INDEXES)
+    op.execute("ANALYZE access_logs")
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE access_logs RENAME TO access_logs_partitioned")
+    op.execute("ALTER TABLE access_logs_partitioned RENAME CONSTRAINT access_logs_pkey TO access_logs_partitioned_pkey")
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE access_logs (
+            id integer NOT NULL DEFAULT nextval('access_logs_id_seq') PRIMARY KEY,
+            student_id integer NOT NULL REFERENCES students (id),
+            student_plan_id integer NOT NULL REFERENCES student_plans (id),
+            access_time timestamp without time zone DEFAULT now(),
+            notes text
+        )
+    """)
+    op.execute("ALTER SEQUENCE access_logs_id_seq OWNED BY access_logs.id")
+    op.execute("""
+        INSERT INTO access_logs (id, student_id, student_plan_id, access_time, notes)
+        SELECT id, student_id, student_plan_id, access_time, notes FROM access_logs_partitioned
+    """)
+    op.execute("DROP TABLE access_logs_partitioned")
+    op.execute(INDEXES)
+    op.execute("DROP FUNCTION access_logs_ensure_partition(date)")
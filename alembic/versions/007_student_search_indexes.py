@@ -0,0 +1,36 @@
+"""Indexes for the student search
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Trigram operator classes for the case-insensitive name substring
+    # search (crud.search_students)
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # CONCURRENTLY keeps students writable while the indexes are built
+    with op.get_context().autocommit_block():
+        op.create_index('ix_students_name_trgm', 'students', [sa.text('lower(name) gin_trgm_ops')],
+                        postgresql_using='gin', postgresql_concurrently=True)
+        # LIKE 'abc%' can only use a btree under the C collation or with
+        # pattern_ops, whatever the database collation is
+        op.create_index('ix_students_name_prefix', 'students', [sa.text('lower(name) text_pattern_ops')],
+                        postgresql_concurrently=True)
+        op.create_index('ix_students_document_prefix', 'students', [sa.text('document text_pattern_ops')],
+                        postgresql_concurrently=True)
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_students_document_prefix', table_name='students', postgresql_concurrently=True)
+        op.drop_index('ix_students_name_prefix', table_name='students', postgresql_concurrently=True)
+        op.drop_index('ix_students_name_trgm', table_name='students', postgresql_concurrently=True)
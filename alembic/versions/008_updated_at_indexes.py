@@ -0,0 +1,27 @@
+"""Indexes on updated_at for conditional GET validators
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # The list ETags read max(updated_at) of these tables on every request
+    with op.get_context().autocommit_block():
+        op.create_index('ix_students_updated_at', 'students', ['updated_at'], postgresql_concurrently=True)
+        op.create_index('ix_plans_updated_at', 'plans', ['updated_at'], postgresql_concurrently=True)
+        op.create_index('ix_student_plans_updated_at', 'student_plans', ['updated_at'], postgresql_concurrently=True)
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_student_plans_updated_at', table_name='student_plans', postgresql_concurrently=True)
+        op.drop_index('ix_plans_updated_at', table_name='plans', postgresql_concurrently=True)
+        op.drop_index('ix_students_updated_at', table_name='students', postgresql_concurrently=True)
@@ -0,0 +1,31 @@
+"""Bring updated_at written with the server's local now() back to UTC
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+TABLES = ('students', 'plans', 'student_plans')
+
+def upgrade() -> None:
+    # Inserts used to take the database's local now(), updates Python's
+    # utcnow(). East of UTC, inserted rows sit in the future and pin
+    # max(updated_at) in the list ETags until the clock catches up; clamp
+    # them to the current UTC time. Rows in the past order correctly.
+    for table in TABLES:
+        op.execute(
+            f"UPDATE {table} SET updated_at = now() AT TIME ZONE 'UTC' "
+            f"WHERE updated_at > now() AT TIME ZONE 'UTC'"
+        )
+
+def downgrade() -> None:
+    # The clamped values are valid UTC timestamps; nothing to restore
+    pass
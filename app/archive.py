@@ -0,0 +1,145 @@
+# app/archive.py
+# Cold storage for old access history. Each month older than
+# settings.archive_after_months is written to one gzip-compressed,
+# column-oriented JSON file under settings.archive_dir and then removed
+# from access_logs (a partition drop when the table is partitioned).
+# Totals keep working because student_plan_usage and access_stats_hourly
+# hold the monthly and hourly counts; swipe-level rows are read back from
+# the files on demand.
+import gzip
+import json
+import logging
+import os
+from datetime import date, datetime
+from typing import List, Optional
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app import crud, models
+from app.cache import report_cache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+# Exported ids removed per DELETE when the month is not its own partition
+DELETE_CHUNK_SIZE = 5000
+
+def archive_file_name(year: int, month: int) -> str:
+    return f"access_logs_{year:04d}-{month:02d}.json.gz"
+
+def _archive_path(file_name: str) -> str:
+    return os.path.join(settings.archive_dir, file_name)
+
+def _write_month(db: Session, year: int, month: int, path: str) -> List[int]:
+    """Write the month's logs column by column; returns the ids written"""
+    start, end = crud.month_bounds(year, month)
+    columns = {name: [] for name in crud.EXPORT_COLUMNS}
+    for rows in crud.iter_access_log_export(db, start, end):
+        for row in rows:
+            for name, value in zip(crud.EXPORT_COLUMNS, row):
+                columns[name].append(value.isoformat() if isinstance(value, datetime) else value)
+    row_count = len(columns["id"])
+    if not row_count:
+        return []
+
+    # Write next to the target and rename, so a crash never leaves a
+    # truncated file under the final name
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".partial"
+    with gzip.open(partial, "wt", encoding="utf-8") as file:
+        json.dump({
+            "format": FORMAT_VERSION, "year": year, "month": month,
+            "row_count": row_count, "columns": columns
+        }, file, ensure_ascii=False, separators=(",", ":"))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+    return columns["id"]
+
+def archive_month(db: Session, year: int, month: int) -> int:
+    """
+    Move one month of access_logs to its archive file in one transaction.
+    Returns the number of rows archived (0 when the month is empty or
+    already archived). Only rows that made it into the file are removed:
+    the month's partition is locked against inserts before the export and
+    dropped after it; without one, the exported ids are deleted and a log
+    inserted for the month meanwhile stays online.
+    """
+    if db.get(models.AccessLogArchive, (year, month)) is not None:
+        return 0
+    locked = crud.lock_access_log_partition(db, year, month)
+    file_name = archive_file_name(year, month)
+    exported_ids = _write_month(db, year, month, _archive_path(file_name))
+    if not exported_ids:
+        db.rollback()
+        return 0
+    row_count = len(exported_ids)
+
+    if locked:
+        crud.drop_access_log_partition(db, year, month, drop=True)
+    else:
+        for chunk_start in range(0, row_count, DELETE_CHUNK_SIZE):
+            db.execute(delete(models.AccessLog).where(
+                models.AccessLog.id.in_(exported_ids[chunk_start:chunk_start + DELETE_CHUNK_SIZE])
+            ))
+    db.add(models.AccessLogArchive(year=year, month=month, path=file_name, row_count=row_count))
+    db.commit()
+    report_cache.clear()
+    logger.info("Archived %d access logs of %04d-%02d to %s", row_count, year, month, file_name)
+    return row_count
+
+def archive_cutoff(today: Optional[date] = None) -> date:
+    """First day of the oldest month that stays online"""
+    today = today or datetime.utcnow().date()
+    year, month = divmod(today.year * 12 + today.month - 1 - settings.archive_after_months, 12)
+    return date(year, month + 1, 1)
+
+def archive_old_months(db: Session, before: Optional[date] = None) -> List[tuple]:
+    """Archive every month before `before` (default archive_cutoff()), oldest first"""
+    before = before or archive_cutoff()
+    oldest = db.execute(select(func.min(models.AccessLog.access_time))).scalar()
+    archived = []
+    if oldest is None:
+        return archived
+    year, month = oldest.year, oldest.month
+    while date(year, month, 1) < before:
+        row_count = archive_month(db, year, month)
+        if row_count:
+            archived.append((year, month, row_count))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return archived
+
+def _read_columns(file_name: str) -> dict:
+    with gzip.open(_archive_path(file_name), "rt", encoding="utf-8") as file:
+        return json.load(file)["columns"]
+
+def get_archived_student_accesses(db: Session, student_id: int, year: int, month: int) -> Optional[list]:
+    """
+    A student's accesses in an archived month, newest first, in the same
+    shape as crud.get_student_accesses items. None when the month is not
+    archived.
+    """
+    cache_key = ("student", student_id, (year, month), "archive")
+    items = report_cache.get(cache_key)
+    if items is not None:
+        return items
+
+    archive = db.get(models.AccessLogArchive, (year, month))
+    if archive is None:
+        return None
+    columns = _read_columns(archive.path)
+    items = [{
+        "id": columns["id"][i],
+        "student_id": student_id,
+        "student_plan_id": columns["student_plan_id"][i],
+        "access_time": datetime.fromisoformat(columns["access_time"][i]),
+        "notes": columns["notes"][i],
+        "student_plan": {
+            "id": columns["student_plan_id"][i],
+            "plan": {"id": columns["plan_id"][i], "name": columns["plan_name"][i]}
+            if columns["plan_id"][i] else None
+        }
+    } for i, row_student in enumerate(columns["student_id"]) if row_student == student_id]
+    items.sort(key=lambda item: (item["access_time"], item["id"]), reverse=True)
+    report_cache.set(cache_key, items)
+    return items
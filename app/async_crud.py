@@ -0,0 +1,18 @@
+# app/async_crud.py
+# Async entry points for the hot request paths. Check-in runs the sync
+# engine in app.crud through AsyncSession.run_sync, so the quota, rollup
+# and cache rules live in one place; the database I/O still goes through
+# the async driver.
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app import crud, models
+from app.crud import CHECK_IN_NOTES, CheckInResult
+
+async def get_admin_by_username(db: AsyncSession, username: str) -> Optional[models.Admin]:
+    result = await db.execute(select(models.Admin).where(models.Admin.username == username))
+    return result.scalar_one_or_none()
+
+async def check_in_student(db: AsyncSession, document: str, notes: Optional[str] = CHECK_IN_NOTES) -> CheckInResult:
+    """Async counterpart of crud.check_in_student (same implementation)"""
+    return await db.run_sync(crud.check_in_student, document, notes)
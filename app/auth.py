@@ -5,11 +5,14 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
 from app.models import Admin
 from app.schemas import TokenData
 from app.config import settings
+from app.async_crud import get_admin_by_username
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -92,6 +95,15 @@ def authenticate_admin(db: Session, username: str, password: str):
         return False
     return admin
 
+async def authenticate_admin_async(db: AsyncSession, username: str, password: str):
+    """authenticate_admin for async handlers; bcrypt runs off the event loop"""
+    admin = await get_admin_by_username(db, username)
+    if not admin:
+        return False
+    if not await run_in_threadpool(verify_password, password, admin.hashed_password):
+        return False
+    return admin
+
 def create_admin_user(db: Session):
     """Create default admin user if it doesn't exist"""
     admin = db.query(Admin).filter(Admin.username == settings.admin_username).first()
@@ -0,0 +1,182 @@
+# app/cache.py
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Hashable, Optional
+from app.config import settings
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache whose entries also expire after a TTL.
+    With group_of, keys are indexed by group so every entry of a group
+    can be dropped at once without scanning the cache.
+    """
+
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float,
+                 group_of: Optional[Callable[[Hashable], Hashable]] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.group_of = group_of
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._groups: dict = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._forget(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            if self.group_of:
+                self._groups.setdefault(self.group_of(key), set()).add(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+                self.evictions += 1
+
+    def _forget(self, key: Hashable) -> None:
+        if self.group_of:
+            group = self.group_of(key)
+            keys = self._groups.get(group)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._groups[group]
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._forget(key)
+
+    def invalidate_group(self, group: Hashable) -> None:
+        with self._lock:
+            for key in self._groups.pop(group, ()):
+                self._entries.pop(key, None)
+
+    def invalidate_groups(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every group the predicate accepts; scans groups, not entries"""
+        with self._lock:
+            for group in [group for group in self._groups if predicate(group)]:
+                for key in self._groups.pop(group):
+                    self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._groups.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+class SwipeWindow:
+    """
+    Remembers accepted kiosk check-ins per document for window_seconds so
+    a repeat swipe can be answered without touching the database. Entries
+    are queued in expiry order (the window is constant) and dropped as
+    soon as they age out.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._results: dict = {}
+        self._expiry: deque = deque()
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.suppressed = 0
+
+    def _expire(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, document = self._expiry.popleft()
+            entry = self._results.get(document)
+            if entry is not None and entry[0] == expires_at:
+                del self._results[document]
+
+    def get(self, document: str) -> Optional[Any]:
+        """The previous result if `document` was accepted inside the window"""
+        if self.window_seconds <= 0:
+            return None
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._results.get(document)
+            if entry is None:
+                return None
+            self.suppressed += 1
+            return entry[1]
+
+    def remember(self, document: str, result: Any) -> None:
+        if self.window_seconds <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            expires_at = now + self.window_seconds
+            self._results[document] = (expires_at, result)
+            self._expiry.append((expires_at, document))
+            self.recorded += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._expiry.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "name": "swipe_window",
+                "size": len(self._results),
+                "window_seconds": self.window_seconds,
+                "recorded": self.recorded,
+                "suppressed": self.suppressed
+            }
+
+# Read-through caches used by crud. Values are pydantic snapshots, never
+# ORM instances, so they can be shared safely across sessions and threads.
+student_cache = TTLCache("students_by_document", settings.cache_max_entries, settings.cache_ttl_seconds)
+plan_cache = TTLCache("plans", settings.cache_max_entries, settings.cache_ttl_seconds)
+active_plan_cache = TTLCache("active_student_plans", settings.cache_max_entries, settings.cache_ttl_seconds)
+
+# Computed report payloads, keyed by (report type, id, period, *params)
+# and grouped by (report type, id) for targeted invalidation
+report_cache = TTLCache(
+    "reports", settings.report_cache_max_entries, settings.report_cache_ttl_seconds,
+    group_of=lambda key: key[:2]
+)
+
+# Admin dashboard summary, keyed by the number of recent check-ins shown
+dashboard_cache = TTLCache("dashboard", 16, settings.dashboard_cache_seconds)
+
+# Double-swipe suppression shared by both kiosk routes
+swipe_window = SwipeWindow(settings.swipe_suppression_seconds)
+
+def cache_stats() -> list:
+    return [cache.stats() for cache in (student_cache, plan_cache, active_plan_cache, report_cache, dashboard_cache, swipe_window)]
@@ -0,0 +1,81 @@
+# app/cli.py
+# Command line entry point for maintenance jobs:
+#   python -m app.cli sweep-plans
+#   python -m app.cli rebuild-stats [--since YYYY-MM-DD]
+#   python -m app.cli partitions
+#   python -m app.cli detach-partition YYYY-MM [--drop]
+#   python -m app.cli archive [--before YYYY-MM]
+#   python -m app.cli import-students FILE.csv [--dry-run]
+import argparse
+from datetime import date, datetime
+from app import tasks
+
+def sweep_plans(args):
+    changed = tasks.sweep_expired_plans()
+    print(f"Planes desactivados: {changed}")
+
+def rebuild_stats(args):
+    buckets = tasks.rebuild_access_stats(args.since)
+    print(f"Estadísticas reconstruidas: {buckets} franjas horarias")
+
+def partitions(args):
+    created = tasks.maintain_access_log_partitions()
+    print(f"Particiones creadas: {', '.join(created) if created else 'ninguna'}")
+
+def detach_partition(args):
+    if tasks.detach_access_log_partition(args.month.year, args.month.month, args.drop):
+        print(f"Partición {args.month:%Y-%m} {'eliminada' if args.drop else 'separada'}")
+    else:
+        print(f"No existe la partición {args.month:%Y-%m} (o access_logs no está particionada)")
+
+def archive_logs(args):
+    archived = tasks.archive_access_logs(args.before.date() if args.before else None)
+    for year, month, row_count in archived:
+        print(f"{year:04d}-{month:02d}: {row_count} registros archivados")
+    print(f"Meses archivados: {len(archived)}")
+
+def import_students(args):
+    report = tasks.import_students(args.file, args.dry_run)
+    for error in report.errors:
+        print(f"Línea {error.line}{f' ({error.document})' if error.document else ''}: {error.message}")
+    verb = "válidos" if report.dry_run else "creados"
+    print(f"Filas: {report.rows}, estudiantes {verb}: {report.created}, "
+          f"planes asignados: {report.plans_assigned}, errores: {len(report.errors)}")
+
+def year_month(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Tareas de mantenimiento")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sweep_parser = subparsers.add_parser("sweep-plans", help="Desactivar planes vencidos")
+    sweep_parser.set_defaults(func=sweep_plans)
+
+    stats_parser = subparsers.add_parser("rebuild-stats", help="Reconstruir las estadísticas horarias de accesos")
+    stats_parser.add_argument("--since", type=date.fromisoformat, help="Solo desde esta fecha (YYYY-MM-DD)")
+    stats_parser.set_defaults(func=rebuild_stats)
+
+    partitions_parser = subparsers.add_parser("partitions", help="Crear las particiones mensuales próximas de access_logs")
+    partitions_parser.set_defaults(func=partitions)
+
+    detach_parser = subparsers.add_parser("detach-partition", help="Separar (o eliminar) un mes de access_logs")
+    detach_parser.add_argument("month", type=year_month, help="Mes a separar (YYYY-MM)")
+    detach_parser.add_argument("--drop", action="store_true", help="Eliminar la partición después de separarla")
+    detach_parser.set_defaults(func=detach_partition)
+
+    archive_parser = subparsers.add_parser("archive", help="Mover los accesos antiguos a archivos comprimidos")
+    archive_parser.add_argument("--before", type=year_month,
+                                help="Archivar los meses anteriores a este (YYYY-MM); por defecto ARCHIVE_AFTER_MONTHS")
+    archive_parser.set_defaults(func=archive_logs)
+
+    import_parser = subparsers.add_parser("import-students", help="Crear estudiantes en lote desde un CSV")
+    import_parser.add_argument("file", help="CSV con columnas name, document y opcionalmente plan, start_date, end_date")
+    import_parser.add_argument("--dry-run", action="store_true", help="Solo validar, sin crear nada")
+    import_parser.set_defaults(func=import_students)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# app/conditional.py
+# Conditional GET for API reads. Routes compute a cheap version of the
+# data behind a response (row counts, max ids and max updated_at, or the
+# row's own updated_at) and ask not_modified() before serializing; a
+# client whose copy is current gets 304 with no body. ETags are weak: the
+# same data may be sent with different encodings (app.compression).
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from starlette.requests import Request
+from starlette.responses import Response
+
+def make_etag(*parts) -> str:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+def http_date(value: datetime) -> str:
+    # Timestamps are stored as naive UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+def _modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return True
+    if since is None or since.tzinfo is None:
+        return True
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    # HTTP dates have whole seconds
+    return last_modified.replace(microsecond=0) > since
+
+def not_modified(request: Request, response: Response, version: tuple,
+                 last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    Set ETag (from the path, the query string and `version`), Last-Modified
+    and Cache-Control on `response`. Returns the 304 to send instead when
+    If-None-Match matches or, without it, If-Modified-Since is not older
+    than last_modified. Pass last_modified only where deletes move it too.
+    """
+    etag = make_etag(request.url.path, sorted(request.query_params.multi_items()), version)
+    # no-cache: browsers keep the body but revalidate on every navigation
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    elif last_modified is not None and "if-modified-since" in request.headers:
+        fresh = not _modified_since(request.headers["if-modified-since"], last_modified)
+    else:
+        fresh = False
+    return Response(status_code=304, headers=headers) if fresh else None
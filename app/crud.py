@@ -1,35 +1,112 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, extract
-from datetime import datetime, timedelta
-from typing import List, Optional
+from sqlalchemy.orm import Session, contains_eager, joinedload
+from sqlalchemy import (
+    Date, DateTime, and_, bindparam, case, cast, delete, distinct, extract, func, insert, literal, literal_column, or_,
+    select, text, update
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import date, datetime, timedelta
+from typing import Iterable, List, NamedTuple, Optional
 from app import models, schemas
+from app.pagination import Page, after_cursor, decode_cursor, next_cursor, paginate
+from app.cache import student_cache, plan_cache, active_plan_cache, report_cache, dashboard_cache, swipe_window
+
+# List versions for conditional GET (app.conditional)
+def _max(column):
+    return select(func.max(column)).scalar_subquery()
+
+def _list_version(db: Session, model, *nested) -> tuple:
+    """
+    Version of the rows behind a list response: count, max(id) and
+    max(updated_at) of `model` plus max(updated_at) of the `nested` models
+    it serializes, in one statement of indexed aggregates. Adding, editing
+    or deleting a row changes it.
+    """
+    columns = [select(func.count()).select_from(model).scalar_subquery(), _max(model.id), _max(model.updated_at)]
+    columns += [_max(other.updated_at) for other in nested]
+    return tuple(db.execute(select(*columns)).one())
 
 # Student CRUD
 def get_student(db: Session, student_id: int):
     return db.query(models.Student).filter(models.Student.id == student_id).first()
 
-def get_student_by_document(db: Session, document: str):
-    return db.query(models.Student).filter(models.Student.document == document).first()
+def get_student_by_document(db: Session, document: str) -> Optional[schemas.Student]:
+    """Read-through cached lookup; returns a snapshot, not an ORM instance"""
+    student = student_cache.get(document)
+    if student is None:
+        db_student = db.query(models.Student).filter(models.Student.document == document).first()
+        if db_student is None:
+            return None
+        student = _cache_student(db_student)
+    return student
 
-def get_students(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Student).offset(skip).limit(limit).all()
+def get_students(db: Session, skip: int = 0, limit: int = 100,
+                 cursor: Optional[str] = None, with_total: bool = False) -> Page:
+    """Students by id; page with cursor (skip is kept for old clients)"""
+    return paginate(db.query(models.Student), (models.Student.id,), cursor, limit, with_total=with_total, skip=skip)
+
+def get_students_version(db: Session) -> tuple:
+    return _list_version(db, models.Student)
+
+STUDENT_SEARCH_LIMIT = 10
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def student_search_stmt(q: str, limit: int = STUDENT_SEARCH_LIMIT):
+    """
+    Autocomplete lookup: case-insensitive substring match on the name and
+    prefix match on the document, each served by an index from migration
+    007. Below three characters a bare substring cannot be narrowed by
+    trigrams, so the name must start with the term or have a word that
+    does ("lo" finds "Ana Lopez"); the space anchors the pattern to
+    word-start trigrams the index can use. Ranked exact document, document
+    prefix, name prefix, word start in the name, any other match.
+    """
+    term = _like_escape(q.lower())
+    name = func.lower(models.Student.name)
+    document = models.Student.document
+    document_prefix = document.like(_like_escape(q) + "%", escape="\\")
+    name_prefix = name.like(term + "%", escape="\\")
+    word_start = name.like("% " + term + "%", escape="\\")
+    name_match = name.like("%" + term + "%", escape="\\") if len(q) >= 3 else or_(name_prefix, word_start)
+
+    rank = case(
+        (document == q, 0),
+        (document_prefix, 1),
+        (name_prefix, 2),
+        (word_start, 3),
+        else_=4
+    )
+    return select(models.Student).where(
+        or_(document_prefix, name_match)
+    ).order_by(rank, name, models.Student.id).limit(limit)
+
+def search_students(db: Session, q: str, limit: int = STUDENT_SEARCH_LIMIT) -> List[models.Student]:
+    q = q.strip()
+    if not q:
+        return []
+    return db.execute(student_search_stmt(q, limit)).scalars().all()
 
 def create_student(db: Session, student: schemas.StudentCreate):
     db_student = models.Student(**student.dict())
     db.add(db_student)
     db.commit()
     db.refresh(db_student)
+    _invalidate_student(db_student.id, db_student.document)
     return db_student
 
 def update_student(db: Session, student_id: int, student: schemas.StudentUpdate):
     db_student = db.query(models.Student).filter(models.Student.id == student_id).first()
     if db_student:
+        old_document = db_student.document
         for key, value in student.dict(exclude_unset=True).items():
             setattr(db_student, key, value)
         db_student.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_student)
+        _invalidate_student(db_student.id, old_document, db_student.document)
+        _invalidate_reports(student_ids=[db_student.id], all_plans=True)
     return db_student
 
 def delete_student(db: Session, student_id: int):
@@ -37,14 +114,29 @@ def delete_student(db: Session, student_id: int):
     if db_student:
         db.delete(db_student)
         db.commit()
+        _invalidate_student(db_student.id, db_student.document)
+        _invalidate_reports(student_ids=[db_student.id], all_plans=True)
     return db_student
 
 # Plan CRUD
-def get_plan(db: Session, plan_id: int):
-    return db.query(models.Plan).filter(models.Plan.id == plan_id).first()
+def get_plan(db: Session, plan_id: int) -> Optional[schemas.Plan]:
+    """Read-through cached lookup; returns a snapshot, not an ORM instance"""
+    plan = plan_cache.get(plan_id)
+    if plan is None:
+        db_plan = db.query(models.Plan).filter(models.Plan.id == plan_id).first()
+        if db_plan is None:
+            return None
+        plan = schemas.Plan.model_validate(db_plan)
+        plan_cache.set(plan_id, plan)
+    return plan
 
-def get_plans(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Plan).offset(skip).limit(limit).all()
+def get_plans(db: Session, skip: int = 0, limit: int = 100,
+              cursor: Optional[str] = None, with_total: bool = False) -> Page:
+    """Plans by id; page with cursor (skip is kept for old clients)"""
+    return paginate(db.query(models.Plan), (models.Plan.id,), cursor, limit, with_total=with_total, skip=skip)
+
+def get_plans_version(db: Session) -> tuple:
+    return _list_version(db, models.Plan)
 
 def create_plan(db: Session, plan: schemas.PlanCreate):
     db_plan = models.Plan(**plan.dict())
@@ -61,6 +153,7 @@ def update_plan(db: Session, plan_id: int, plan: schemas.PlanUpdate):
         db_plan.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(db_plan)
+        _invalidate_plan(plan_id)
     return db_plan
 
 def delete_plan(db: Session, plan_id: int):
@@ -68,24 +161,60 @@ def delete_plan(db: Session, plan_id: int):
     if db_plan:
         db.delete(db_plan)
         db.commit()
+        _invalidate_plan(plan_id)
     return db_plan
 
 # StudentPlan CRUD
+# What schemas.StudentPlan serializes, loaded with the row. Both are
+# many-to-one, so a join adds no rows and does not disturb LIMIT.
+STUDENT_PLAN_LOADING = (
+    joinedload(models.StudentPlan.student),
+    joinedload(models.StudentPlan.plan)
+)
+
 def get_student_plan(db: Session, student_plan_id: int):
-    return db.query(models.StudentPlan).filter(models.StudentPlan.id == student_plan_id).first()
+    return db.query(models.StudentPlan).options(*STUDENT_PLAN_LOADING).filter(
+        models.StudentPlan.id == student_plan_id
+    ).first()
 
-def get_student_plans(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.StudentPlan).offset(skip).limit(limit).all()
+def get_student_plans(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                      with_total: bool = False, compact: bool = False) -> Page:
+    """
+    Student plans by id; page with cursor (skip is kept for old clients).
+    compact pages hold flat rows (schemas.StudentPlanCompact) read from
+    one join instead of full nested objects.
+    """
+    sp = models.StudentPlan
+    if compact:
+        query = db.query(
+            sp.id, sp.student_id, models.Student.name.label("student_name"),
+            models.Student.document.label("student_document"), sp.plan_id, models.Plan.name.label("plan_name"),
+            sp.start_date, sp.end_date, sp.is_active
+        ).join(models.Student, models.Student.id == sp.student_id).join(models.Plan, models.Plan.id == sp.plan_id)
+    else:
+        query = db.query(sp).options(*STUDENT_PLAN_LOADING)
+    return paginate(query, (sp.id,), cursor, limit, with_total=with_total, skip=skip)
+
+def get_student_plans_version(db: Session) -> tuple:
+    return _list_version(db, models.StudentPlan, models.Student, models.Plan)
 
-def get_active_student_plan(db: Session, student_id: int):
+def get_active_student_plan(db: Session, student_id: int) -> Optional[schemas.StudentPlan]:
     """
     Get the truly active plan for a student
     Priority: is_active=True AND current date within range
+    Read-through cached; returns a snapshot, not an ORM instance.
+    Pure read: expired plans are deactivated by deactivate_expired_student_plans
     """
     now = datetime.utcnow()
     
-    # First try: get plan that is both marked active AND within date range
-    active_plan = db.query(models.StudentPlan).filter(
+    cached_plan = active_plan_cache.get(student_id)
+    if cached_plan is not None and cached_plan.start_date <= now <= cached_plan.end_date:
+        return cached_plan
+    
+    active_plan = db.query(models.StudentPlan).options(
+        joinedload(models.StudentPlan.student),
+        joinedload(models.StudentPlan.plan)
+    ).filter(
         and_(
             models.StudentPlan.student_id == student_id,
             models.StudentPlan.is_active == True,
@@ -95,42 +224,117 @@ def get_active_student_plan(db: Session, student_id: int):
     ).order_by(models.StudentPlan.created_at.desc()).first()
     
     if active_plan:
-        return active_plan
-    
-    # If no active plan found, check if there are plans marked active but with wrong dates
-    # This helps identify data inconsistencies
-    marked_active = db.query(models.StudentPlan).filter(
-        and_(
-            models.StudentPlan.student_id == student_id,
-            models.StudentPlan.is_active == True
-        )
-    ).all()
-    
-    # If we have plans marked as active but outside date range, fix them
-    if marked_active:
-        for plan in marked_active:
-            if plan.end_date < now:
-                plan.is_active = False
-                plan.updated_at = now
-        db.commit()
+        return _cache_active_plan(active_plan)
     
     return None
 
+# access_logs partitions (PostgreSQL, migration 005)
+def access_logs_partitioned(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('access_logs'))"
+    )).scalar()
+
+def access_log_partition_name(year: int, month: int) -> str:
+    return f"access_logs_y{year:04d}m{month:02d}"
+
+def ensure_access_log_partitions(db: Session, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """
+    Create the partitions for the current month and the next months_ahead
+    months if they are missing; returns the names created. A no-op when
+    access_logs is not partitioned.
+    """
+    if not access_logs_partitioned(db):
+        return []
+    today = today or datetime.utcnow().date()
+    created = []
+    for offset in range(months_ahead + 1):
+        year, month = divmod(today.month - 1 + offset, 12)
+        name = db.execute(
+            text("SELECT access_logs_ensure_partition(:month_start)"),
+            {"month_start": date(today.year + year, month + 1, 1)}
+        ).scalar()
+        if name:
+            created.append(name)
+    db.commit()
+    return created
+
+def _access_log_partition_exists(db: Session, name: str) -> bool:
+    return access_logs_partitioned(db) and db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None
+
+def lock_access_log_partition(db: Session, year: int, month: int) -> bool:
+    """
+    Block writes to one month's partition until the caller's transaction
+    ends (SHARE mode: reads go on, inserts for that month wait). Returns
+    False when that partition does not exist.
+    """
+    name = access_log_partition_name(year, month)
+    if not _access_log_partition_exists(db, name):
+        return False
+    db.execute(text(f'LOCK TABLE "{name}" IN SHARE MODE'))
+    return True
+
+def drop_access_log_partition(db: Session, year: int, month: int, drop: bool = False) -> bool:
+    """
+    Detach one month from access_logs, and drop it if asked, in the
+    caller's transaction. Both are catalog-only operations, unlike
+    DELETEing the month's rows. Returns False when that partition does
+    not exist.
+    """
+    name = access_log_partition_name(year, month)
+    if not _access_log_partition_exists(db, name):
+        return False
+    db.execute(text(f'ALTER TABLE access_logs DETACH PARTITION "{name}"'))
+    if drop:
+        db.execute(text(f'DROP TABLE "{name}"'))
+    return True
+
+def detach_access_log_partition(db: Session, year: int, month: int, drop: bool = False) -> bool:
+    if not drop_access_log_partition(db, year, month, drop):
+        return False
+    db.commit()
+    _invalidate_reports(all_students=True, all_plans=True)
+    return True
+
+def deactivate_expired_student_plans(db: Session, now: Optional[datetime] = None) -> int:
+    """Flip is_active off for every plan past its end_date; returns the number of rows changed"""
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(models.StudentPlan).where(
+            and_(
+                models.StudentPlan.is_active == True,
+                models.StudentPlan.end_date < now
+            )
+        ).values(is_active=False, updated_at=now).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount:
+        report_cache.clear()
+    return result.rowcount
+
 def create_student_plan(db: Session, student_plan: schemas.StudentPlanCreate):
     db_student_plan = models.StudentPlan(**student_plan.dict())
     db.add(db_student_plan)
     db.commit()
-    db.refresh(db_student_plan)
-    return db_student_plan
+    active_plan_cache.invalidate(db_student_plan.student_id)
+    _invalidate_reports([db_student_plan.student_id], [db_student_plan.plan_id])
+    return get_student_plan(db, db_student_plan.id)
 
 def update_student_plan(db: Session, student_plan_id: int, student_plan: schemas.StudentPlanUpdate):
     db_student_plan = db.query(models.StudentPlan).filter(models.StudentPlan.id == student_plan_id).first()
     if db_student_plan:
+        old_student_id, old_plan_id = db_student_plan.student_id, db_student_plan.plan_id
         for key, value in student_plan.dict(exclude_unset=True).items():
             setattr(db_student_plan, key, value)
         db_student_plan.updated_at = datetime.utcnow()
         db.commit()
-        db.refresh(db_student_plan)
+        db_student_plan = get_student_plan(db, student_plan_id)
+        active_plan_cache.invalidate(old_student_id)
+        active_plan_cache.invalidate(db_student_plan.student_id)
+        _invalidate_reports(
+            {old_student_id, db_student_plan.student_id}, {old_plan_id, db_student_plan.plan_id}
+        )
     return db_student_plan
 
 def delete_student_plan(db: Session, student_plan_id: int):
@@ -138,96 +342,829 @@ def delete_student_plan(db: Session, student_plan_id: int):
     if db_student_plan:
         db.delete(db_student_plan)
         db.commit()
+        active_plan_cache.invalidate(db_student_plan.student_id)
+        _invalidate_reports([db_student_plan.student_id], [db_student_plan.plan_id])
     return db_student_plan
 
+# Cache helpers
+def _cache_student(db_student: models.Student) -> schemas.Student:
+    student = schemas.Student.model_validate(db_student)
+    student_cache.set(student.document, student)
+    return student
+
+def _cache_active_plan(db_student_plan: models.StudentPlan) -> schemas.StudentPlan:
+    student_plan = schemas.StudentPlan.model_validate(db_student_plan)
+    active_plan_cache.set(student_plan.student_id, student_plan)
+    return student_plan
+
+def _invalidate_student(student_id: int, *documents: str):
+    for document in documents:
+        student_cache.invalidate(document)
+    active_plan_cache.invalidate(student_id)
+
+def _invalidate_plan(plan_id: int):
+    plan_cache.invalidate(plan_id)
+    # Cached active plans embed the plan, and plans change rarely enough
+    # that dropping them all is cheaper than tracking who uses which plan
+    active_plan_cache.clear()
+    _invalidate_reports(plan_ids=[plan_id], all_students=True)
+
+def invalidate_imported_students(plan_ids: Iterable[int]):
+    """
+    For bulk inserts of new students made outside this module (CSV
+    import): they have no cached lookups yet, but the reports of the
+    plans they joined list them
+    """
+    _invalidate_reports(plan_ids=plan_ids)
+
+def _invalidate_reports(student_ids=(), plan_ids=(), all_students: bool = False, all_plans: bool = False):
+    """Drop cached reports touched by a write; other reports stay warm"""
+    for student_id in student_ids:
+        report_cache.invalidate_group(("student", student_id))
+    for plan_id in plan_ids:
+        report_cache.invalidate_group(("plan", plan_id))
+    if all_students or all_plans:
+        kinds = {kind for kind, wanted in (("student", all_students), ("plan", all_plans)) if wanted}
+        report_cache.invalidate_groups(lambda group: group[0] in kinds)
+
 # AccessLog CRUD
+# What schemas.AccessLog serializes. student_plan.student is the log's own
+# student, already in the identity map, so it is not joined a second time.
+ACCESS_LOG_LOADING = (
+    joinedload(models.AccessLog.student),
+    joinedload(models.AccessLog.student_plan).joinedload(models.StudentPlan.plan)
+)
+
 def get_access_log(db: Session, access_log_id: int):
-    return db.query(models.AccessLog).filter(models.AccessLog.id == access_log_id).first()
+    return db.query(models.AccessLog).options(*ACCESS_LOG_LOADING).filter(
+        models.AccessLog.id == access_log_id
+    ).first()
 
-def get_access_logs(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.AccessLog).offset(skip).limit(limit).all()
+def get_access_logs(db: Session, skip: int = 0, limit: int = 100, cursor: Optional[str] = None,
+                    with_total: bool = False, date_from: Optional[datetime] = None,
+                    date_to: Optional[datetime] = None, compact: bool = False) -> Page:
+    """
+    Access logs newest first, keyed on (access_time, id) so each page is
+    an index range scan on ix_access_logs_access_time whatever its depth.
+    date_from is inclusive and date_to exclusive. compact pages hold flat
+    rows (schemas.AccessLogCompact) instead of nested objects.
+    """
+    log = models.AccessLog
+    if compact:
+        query = db.query(
+            log.id, log.access_time, log.notes, log.student_id,
+            models.Student.name.label("student_name"), models.Student.document.label("student_document"),
+            log.student_plan_id, models.Plan.id.label("plan_id"), models.Plan.name.label("plan_name")
+        ).join(
+            models.Student, models.Student.id == log.student_id
+        ).join(
+            models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+        ).join(
+            models.Plan, models.Plan.id == models.StudentPlan.plan_id
+        )
+    else:
+        query = db.query(log).options(*ACCESS_LOG_LOADING)
+    if date_from:
+        query = query.filter(log.access_time >= date_from)
+    if date_to:
+        query = query.filter(log.access_time < date_to)
+    return paginate(
+        query, (log.access_time, log.id), cursor, limit,
+        descending=True, with_total=with_total, skip=skip
+    )
 
-def create_access_log(db: Session, access_log: schemas.AccessLogCreate):
-    # Get the student's active plan - ignore the student_plan_id from the request
-    active_plan = get_active_student_plan(db, access_log.student_id)
+def get_access_logs_version(db: Session) -> tuple:
+    """
+    Logs are only inserted or removed oldest month first (archive,
+    partition detach), so min and max id track them without a count
+    """
+    log = models.AccessLog
+    return tuple(db.execute(select(
+        _max(log.id), select(func.min(log.id)).scalar_subquery(),
+        _max(models.Student.updated_at), _max(models.StudentPlan.updated_at), _max(models.Plan.updated_at)
+    )).one())
+
+EXPORT_COLUMNS = (
+    "id", "access_time", "student_id", "student_document", "student_name",
+    "student_plan_id", "plan_id", "plan_name", "notes"
+)
+
+def iter_access_log_export(db: Session, date_from: Optional[datetime] = None,
+                           date_to: Optional[datetime] = None, chunk_size: int = 2000):
+    """
+    Yield lists of export rows (EXPORT_COLUMNS order) in access_time
+    order. The statement runs on a server-side cursor and is fetched
+    chunk_size rows at a time, so memory does not grow with the range.
+    """
+    log = models.AccessLog
+    stmt = select(
+        log.id, log.access_time, log.student_id,
+        models.Student.document, models.Student.name,
+        log.student_plan_id, models.Plan.id, models.Plan.name, log.notes
+    ).join(
+        models.Student, models.Student.id == log.student_id
+    ).outerjoin(
+        models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+    ).outerjoin(
+        models.Plan, models.Plan.id == models.StudentPlan.plan_id
+    )
+    if date_from:
+        stmt = stmt.where(log.access_time >= date_from)
+    if date_to:
+        stmt = stmt.where(log.access_time < date_to)
+    stmt = stmt.order_by(log.access_time, log.id).execution_options(yield_per=chunk_size)
     
-    if not active_plan:
+    for partition in db.execute(stmt).partitions():
+        yield partition
+
+def create_access_log(db: Session, access_log: schemas.AccessLogCreate):
+    # The student's active plan is always resolved server side - the
+    # student_plan_id from the request is ignored
+    now = datetime.utcnow()
+    row = _resolve_check_in(db, models.Student.id == access_log.student_id, now)
+    if row is None or row[1] is None:
         raise ValueError("No hay plan activo para este estudiante")
-    
-    # Check if access is allowed
-    can_access, message, _, remaining = can_student_access(db, access_log.student_id)
-    if not can_access:
-        raise ValueError(f"Acceso denegado: {message}")
-    
-    # Create access log with the CORRECT active plan (ignore request's student_plan_id)
-    access_log_data = {
-        "student_id": access_log.student_id,
-        "student_plan_id": active_plan.id,  # Always use the active plan
-        "notes": access_log.notes
-    }
-    
-    db_access_log = models.AccessLog(**access_log_data)
+
+    result = _register_check_in(db, *_cache_check_in_row(row), access_log.notes, now)
+    if not result.allowed:
+        raise ValueError(f"Acceso denegado: {result.message}")
+
+    return get_access_log(db, result.access_log.id)
+
+# Check-in engine
+CHECK_IN_NOTES = "Acceso registrado automáticamente"
+
+class CheckInResult(NamedTuple):
+    allowed: bool
+    message: str
+    student: Optional[schemas.Student]
+    student_plan: Optional[schemas.StudentPlan]
+    remaining: int
+    access_log: Optional[models.AccessLog]
+
+def _check_in_query(student_filter, now: datetime):
+    """
+    Resolve student, active plan, plan and this month's usage in one query.
+    Rows are (Student, StudentPlan, Plan, monthly_accesses); plan columns
+    are None when the student has no active plan.
+    """
+    return select(
+        models.Student,
+        models.StudentPlan,
+        models.Plan,
+        func.coalesce(models.StudentPlanUsage.access_count, 0)
+    ).select_from(models.Student).outerjoin(
+        models.StudentPlan,
+        and_(
+            models.StudentPlan.student_id == models.Student.id,
+            models.StudentPlan.is_active == True,
+            models.StudentPlan.start_date <= now,
+            models.StudentPlan.end_date >= now
+        )
+    ).outerjoin(
+        models.Plan, models.Plan.id == models.StudentPlan.plan_id
+    ).outerjoin(
+        models.StudentPlanUsage,
+        and_(
+            models.StudentPlanUsage.student_plan_id == models.StudentPlan.id,
+            models.StudentPlanUsage.year == now.year,
+            models.StudentPlanUsage.month == now.month
+        )
+    ).where(student_filter).order_by(models.StudentPlan.created_at.desc()).limit(1)
+
+def _resolve_check_in(db: Session, student_filter, now: datetime):
+    return db.execute(_check_in_query(student_filter, now)).first()
+
+def _cached_check_in(document: str, now: datetime):
+    """(student, student_plan) snapshots when both are cached and the plan still covers `now`"""
+    student = student_cache.get(document)
+    if student is not None:
+        student_plan = active_plan_cache.get(student.id)
+        if student_plan is not None and student_plan.start_date <= now <= student_plan.end_date:
+            return student, student_plan
+    return None
+
+def _cache_check_in_row(row):
+    """Snapshot and cache a _check_in_query row as (student, student_plan, monthly_accesses)"""
+    db_student, db_student_plan, _, monthly_accesses = row
+    student = _cache_student(db_student)
+    student_plan = _cache_active_plan(db_student_plan) if db_student_plan is not None else None
+    return student, student_plan, monthly_accesses
+
+def _check_in_denial(student, student_plan, monthly_accesses: Optional[int]) -> Optional[CheckInResult]:
+    """
+    Quota rules that can be decided before writing. monthly_accesses is
+    None on cache hits, leaving the conditional usage increment as the
+    only quota check.
+    """
+    if student_plan is None:
+        return CheckInResult(False, "No hay plan activo para este estudiante", student, None, 0, None)
+    if monthly_accesses is not None and monthly_accesses >= student_plan.plan.monthly_entries:
+        return _quota_exhausted(student, student_plan)
+    return None
+
+def _quota_exhausted(student, student_plan) -> CheckInResult:
+    return CheckInResult(False, "Has agotado tu límite mensual de ingresos", student, student_plan, 0, None)
+
+def _register_check_in(db: Session, student: schemas.Student, student_plan: Optional[schemas.StudentPlan],
+                       monthly_accesses: Optional[int], notes: Optional[str], now: datetime) -> CheckInResult:
+    """Apply the quota rules to a resolved student and insert the access log"""
+    denial = _check_in_denial(student, student_plan, monthly_accesses)
+    if denial:
+        return denial
+
+    # The counter is the authority: a concurrent swipe may have used the
+    # last entry since the usage was read
+    monthly_entries = student_plan.plan.monthly_entries
+    monthly_accesses = increment_monthly_usage(db, student_plan.id, monthly_entries, now)
+    if monthly_accesses is None:
+        db.rollback()
+        return _quota_exhausted(student, student_plan)
+    record_hourly_access(db, student_plan.plan_id, student.id, now)
+
+    db_access_log = models.AccessLog(
+        student_id=student.id,
+        student_plan_id=student_plan.id,
+        access_time=now,
+        notes=notes
+    )
     db.add(db_access_log)
     db.commit()
-    db.refresh(db_access_log)
+    _invalidate_reports([student.id], [student_plan.plan_id])
+
+    remaining = monthly_entries - monthly_accesses
+    return CheckInResult(True, "Acceso permitido", student, student_plan, remaining, db_access_log)
+
+def check_in_student(db: Session, document: str, notes: Optional[str] = CHECK_IN_NOTES) -> CheckInResult:
+    """
+    Kiosk check-in: resolve the document and register the access. With
+    warm caches only the usage increment and the insert reach the
+    database, committed as one transaction. A repeat swipe inside the
+    suppression window returns the previous result without a query.
+    """
+    previous = swipe_window.get(document)
+    if previous is not None:
+        return previous
+
+    now = datetime.utcnow()
+    cached = _cached_check_in(document, now)
+    if cached:
+        student, student_plan = cached
+        result = _register_check_in(db, student, student_plan, None, notes, now)
+    else:
+        row = _resolve_check_in(db, models.Student.document == document, now)
+        if row is None:
+            return CheckInResult(False, "Estudiante no encontrado", None, None, 0, None)
+        result = _register_check_in(db, *_cache_check_in_row(row), notes, now)
+
+    if result.allowed:
+        swipe_window.remember(document, result)
+    return result
+
+CHECK_IN_REPLAY_WINDOW = timedelta(hours=72)
+CHECK_IN_CLOCK_SKEW = timedelta(minutes=5)
+
+def check_in_batch(db: Session, events: List[schemas.CheckInEvent], max_age: timedelta = CHECK_IN_REPLAY_WINDOW,
+                   max_skew: timedelta = CHECK_IN_CLOCK_SKEW) -> List[schemas.CheckInEventResult]:
+    """
+    Replay buffered kiosk swipes in one transaction. Students, plans and
+    usage counters are resolved with one query each, quota rules are
+    applied in timestamp order with the same semantics as
+    live check-in (evaluated at each event's timestamp), and accepted
+    events are written with a single multi-row insert. Events older than
+    max_age, later than now plus max_skew or inside an archived month are
+    rejected one by one; they would charge arbitrary months and could
+    land in a missing partition.
+    """
+    if not events:
+        return []
+
+    now = datetime.utcnow()
+    earliest, latest = now - max_age, now + max_skew
+    online_from = archived_until(db)
+    if online_from is not None:
+        earliest = max(earliest, datetime.combine(online_from, datetime.min.time()))
+    replayable = [event for event in events if earliest <= event.timestamp <= latest]
 
-    return db_access_log
+    documents = {event.document for event in replayable}
+    students = {
+        student.document: student
+        for student in db.query(models.Student).filter(models.Student.document.in_(documents))
+    }
 
-def get_monthly_access_count(db: Session, student_plan_id: int, month: int, year: int):
-    return db.query(models.AccessLog).filter(
+    first_seen = min((event.timestamp for event in replayable), default=now)
+    last_seen = max((event.timestamp for event in replayable), default=now)
+    plans_by_student = {}
+    for student_plan, plan in db.query(models.StudentPlan, models.Plan).join(
+        models.Plan, models.Plan.id == models.StudentPlan.plan_id
+    ).filter(
         and_(
-            models.AccessLog.student_plan_id == student_plan_id,
-            extract('month', models.AccessLog.access_time) == month,
-            extract('year', models.AccessLog.access_time) == year
+            models.StudentPlan.student_id.in_([student.id for student in students.values()]),
+            models.StudentPlan.is_active == True,
+            models.StudentPlan.start_date <= last_seen,
+            models.StudentPlan.end_date >= first_seen
         )
-    ).count()
+    ).order_by(models.StudentPlan.created_at.desc()):
+        plans_by_student.setdefault(student_plan.student_id, []).append((student_plan, plan))
 
-def can_student_access(db: Session, student_id: int) -> tuple[bool, str, Optional[models.StudentPlan], Optional[int]]:
-    """Check if student can access based on their active plan"""
+    # Create the counters the batch may charge, then lock them in key
+    # order: live swipes and other replays queue behind this batch (a
+    # missing row could not be locked), and two replays cannot deadlock
+    counters = models.StudentPlanUsage
+    student_plan_ids = [student_plan.id for plans in plans_by_student.values() for student_plan, _ in plans]
+    months = {(event.timestamp.year, event.timestamp.month) for event in replayable}
+    usage = {}
+    if student_plan_ids:
+        db.execute(
+            _upsert(db, counters).on_conflict_do_nothing(
+                index_elements=[counters.student_plan_id, counters.year, counters.month]
+            ),
+            [
+                {"student_plan_id": student_plan_id, "year": year, "month": month, "access_count": 0, "updated_at": now}
+                for student_plan_id in sorted(student_plan_ids) for year, month in sorted(months)
+            ]
+        )
+        usage = {
+            (row.student_plan_id, row.year, row.month): row.access_count
+            for row in db.query(counters).filter(
+                counters.student_plan_id.in_(student_plan_ids),
+                or_(*(and_(counters.year == year, counters.month == month) for year, month in months))
+            ).order_by(counters.student_plan_id, counters.year, counters.month).with_for_update()
+        }
+
+    results = [None] * len(events)
+    accepted = []
+    increments = {}
+    hourly = {}
+    for index, event in sorted(enumerate(events), key=lambda item: item[1].timestamp):
+        result = schemas.CheckInEventResult(
+            index=index, document=event.document, timestamp=event.timestamp,
+            accepted=False, message="Estudiante no encontrado"
+        )
+        results[index] = result
+        if not earliest <= event.timestamp <= latest:
+            result.message = "Fecha del evento fuera del rango permitido"
+            continue
+
+        student = students.get(event.document)
+        if student is None:
+            continue
+
+        covering = [
+            (student_plan, plan) for student_plan, plan in plans_by_student.get(student.id, [])
+            if student_plan.start_date <= event.timestamp <= student_plan.end_date
+        ]
+        if not covering:
+            result.message = "No hay plan activo para este estudiante"
+            continue
+
+        student_plan, plan = covering[0]
+        key = (student_plan.id, event.timestamp.year, event.timestamp.month)
+        used = usage.get(key, 0)
+        if used >= plan.monthly_entries:
+            result.message = "Has agotado tu límite mensual de ingresos"
+            continue
+
+        usage[key] = used + 1
+        increments[key] = increments.get(key, 0) + 1
+        result.accepted = True
+        result.message = "Acceso permitido"
+        result.remaining_accesses = plan.monthly_entries - usage[key]
+        hour_key = (plan.id, student.id, event.timestamp.replace(minute=0, second=0, microsecond=0))
+        hourly[hour_key] = hourly.get(hour_key, 0) + 1
+        accepted.append((result, {
+            "student_id": student.id,
+            "student_plan_id": student_plan.id,
+            "access_time": event.timestamp,
+            "notes": f"Acceso sincronizado desde kiosco {event.kiosk_id}"
+        }))
+
+    if accepted:
+        # Rollup first: it checks for earlier logs in each bucket
+        _record_hourly_buckets(db, hourly)
+        access_log_ids = db.scalars(
+            insert(models.AccessLog).returning(models.AccessLog.id, sort_by_parameter_order=True),
+            [values for _, values in accepted]
+        ).all()
+        for (result, _), access_log_id in zip(accepted, access_log_ids):
+            result.access_log_id = access_log_id
+
+        stmt = _upsert(db, counters)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[counters.student_plan_id, counters.year, counters.month],
+                set_={"access_count": counters.access_count + stmt.excluded.access_count, "updated_at": now}
+            ),
+            [
+                {"student_plan_id": student_plan_id, "year": year, "month": month, "access_count": count, "updated_at": now}
+                for (student_plan_id, year, month), count in increments.items()
+            ]
+        )
+
+    db.commit()
+    _invalidate_reports(
+        {student_id for _, student_id, _ in hourly}, {plan_id for plan_id, _, _ in hourly}
+    )
+    return results
+
+def month_bounds(year: int, month: int) -> tuple[datetime, datetime]:
+    """Half-open [start, end) range covering a calendar month"""
+    start = datetime(year, month, 1)
+    end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+    return start, end
+
+def _upsert(db, table):
+    """INSERT ... ON CONFLICT builder for the session's dialect (sync or async)"""
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+def get_monthly_usage(db: Session, student_plan_id: int, month: int, year: int) -> int:
+    """Accesses used this month, read from the student_plan_usage counter"""
+    access_count = db.query(models.StudentPlanUsage.access_count).filter(
+        and_(
+            models.StudentPlanUsage.student_plan_id == student_plan_id,
+            models.StudentPlanUsage.year == year,
+            models.StudentPlanUsage.month == month
+        )
+    ).scalar()
+    return access_count or 0
+
+def increment_monthly_usage(db: Session, student_plan_id: int, monthly_entries: int, now: datetime) -> Optional[int]:
+    """
+    Count one access against the plan's quota for the month of `now`.
+    The increment only applies while the counter is below monthly_entries;
+    returns the new count, or None when the quota is already used up.
+    Runs in the caller's transaction.
+    """
+    return db.execute(_usage_increment_stmt(db, student_plan_id, monthly_entries, now)).scalar()
+
+def _usage_increment_stmt(db, student_plan_id: int, monthly_entries: int, now: datetime):
+    usage = models.StudentPlanUsage
+    stmt = _upsert(db, usage).values(
+        student_plan_id=student_plan_id,
+        year=now.year,
+        month=now.month,
+        access_count=1,
+        updated_at=now
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[usage.student_plan_id, usage.year, usage.month],
+        set_={"access_count": usage.access_count + 1, "updated_at": now},
+        where=usage.access_count < monthly_entries
+    ).returning(usage.access_count)
+    return stmt
+
+# Hourly access rollup (access_stats_hourly)
+def _hourly_stats_stmt(db):
+    """
+    Upsert adding b_accesses to a plan's hour bucket. The student counts as
+    new in the bucket unless they already have an access log in it, so the
+    statement must run before the new logs are inserted.
+    """
+    log = models.AccessLog
+    seen = select(log.id).join(
+        models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+    ).where(
+        log.student_id == bindparam("b_student_id"),
+        log.access_time >= bindparam("b_bucket_start", type_=DateTime),
+        log.access_time < bindparam("b_bucket_end", type_=DateTime),
+        models.StudentPlan.plan_id == bindparam("b_seen_plan_id")
+    ).exists()
+    return _hourly_bucket_upsert(db, case((seen, 0), else_=1))
+
+def _hourly_bucket_upsert(db, student_count):
+    """Add b_accesses and `student_count` to the (b_plan_id, b_day, b_hour) bucket"""
+    stats = models.AccessStatsHourly
+    stmt = _upsert(db, stats).values(
+        plan_id=bindparam("b_plan_id"),
+        day=bindparam("b_day", type_=Date),
+        hour=bindparam("b_hour"),
+        access_count=bindparam("b_accesses"),
+        student_count=student_count,
+        updated_at=bindparam("b_now", type_=DateTime)
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[stats.plan_id, stats.day, stats.hour],
+        set_={
+            "access_count": stats.access_count + stmt.excluded.access_count,
+            "student_count": stats.student_count + stmt.excluded.student_count,
+            "updated_at": stmt.excluded.updated_at
+        }
+    )
+
+def _hourly_stats_params(plan_id: int, student_id: int, access_time: datetime) -> dict:
+    bucket_start = access_time.replace(minute=0, second=0, microsecond=0)
+    return {
+        "b_plan_id": plan_id, "b_seen_plan_id": plan_id, "b_student_id": student_id,
+        "b_day": bucket_start.date(), "b_hour": bucket_start.hour,
+        "b_bucket_start": bucket_start, "b_bucket_end": bucket_start + timedelta(hours=1),
+        "b_accesses": 1, "b_now": datetime.utcnow()
+    }
+
+def _record_hourly_buckets(db: Session, hourly: dict):
+    """
+    Rollup for a batch of new accesses, {(plan_id, student_id, bucket_start):
+    accesses}, with one parameter set per (plan, day, hour): a multi-row
+    ON CONFLICT statement may not touch the same bucket twice. Students
+    with an earlier log in a bucket are found with one query, so this too
+    must run before the new logs are inserted.
+    """
+    log = models.AccessLog
+    starts = [bucket_start for _, _, bucket_start in hourly]
+    seen = {
+        (plan_id, student_id, access_time.replace(minute=0, second=0, microsecond=0))
+        for student_id, plan_id, access_time in db.execute(
+            select(log.student_id, models.StudentPlan.plan_id, log.access_time).join(
+                models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+            ).where(
+                log.student_id.in_({student_id for _, student_id, _ in hourly}),
+                log.access_time >= min(starts),
+                log.access_time < max(starts) + timedelta(hours=1)
+            )
+        )
+    }
+    buckets = {}
+    for key, accesses in hourly.items():
+        plan_id, _, bucket_start = key
+        totals = buckets.setdefault((plan_id, bucket_start), [0, 0])
+        totals[0] += accesses
+        totals[1] += key not in seen
+    now = datetime.utcnow()
+    db.execute(_hourly_bucket_upsert(db, bindparam("b_students")), [
+        {
+            "b_plan_id": plan_id, "b_day": bucket_start.date(), "b_hour": bucket_start.hour,
+            "b_accesses": accesses, "b_students": students, "b_now": now
+        }
+        for (plan_id, bucket_start), (accesses, students) in buckets.items()
+    ])
+
+def record_hourly_access(db: Session, plan_id: int, student_id: int, access_time: datetime):
+    """Count one access in the rollup; runs in the caller's transaction, before the log insert"""
+    db.execute(_hourly_stats_stmt(db), [_hourly_stats_params(plan_id, student_id, access_time)])
+
+def _access_day(db, column):
+    # CAST(... AS DATE) has numeric affinity on SQLite
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(column)
+    return cast(column, Date)
+
+def archived_until(db: Session) -> Optional[date]:
+    """First day after the newest archived month, if any month is archived"""
+    newest = db.query(models.AccessLogArchive.year, models.AccessLogArchive.month).order_by(
+        models.AccessLogArchive.year.desc(), models.AccessLogArchive.month.desc()
+    ).first()
+    if newest is None:
+        return None
+    return month_bounds(*newest)[1].date()
+
+def rebuild_access_stats(db: Session, since: Optional[date] = None) -> int:
+    """
+    Recompute the hourly rollup from access_logs, for every day or from
+    `since` onwards, in one transaction. Archived months are left alone
+    since their logs are no longer in the table. Returns the number of
+    buckets.
+    """
+    floor = archived_until(db)
+    if floor and (since is None or since < floor):
+        since = floor
+    stats = models.AccessStatsHourly
+    log = models.AccessLog
+    delete_stmt = delete(stats)
+    if since:
+        delete_stmt = delete_stmt.where(stats.day >= since)
+    db.execute(delete_stmt)
+    
+    day = _access_day(db, log.access_time)
+    hour = extract("hour", log.access_time)
+    buckets = select(
+        models.StudentPlan.plan_id, day, hour,
+        func.count(log.id), func.count(distinct(log.student_id)), literal(datetime.utcnow(), DateTime)
+    ).join(
+        models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+    ).where(log.access_time.is_not(None))
+    if since:
+        buckets = buckets.where(log.access_time >= datetime.combine(since, datetime.min.time()))
+    buckets = buckets.group_by(models.StudentPlan.plan_id, day, hour)
+    
+    result = db.execute(insert(stats).from_select(
+        ["plan_id", "day", "hour", "access_count", "student_count", "updated_at"], buckets
+    ))
+    db.commit()
+    return result.rowcount
+
+ACCESS_TOTAL_PERIODS = {
+    "day": lambda day: day,
+    "week": lambda day: day - timedelta(days=day.weekday()),
+    "month": lambda day: day.replace(day=1),
+}
+
+def get_access_totals(db: Session, period: str, date_from: date, date_to: date,
+                      plan_id: Optional[int] = None) -> list:
+    """
+    Access totals per day, week (starting Monday) or month over the UTC
+    days [date_from, date_to), read from the hourly rollup. Buckets
+    without accesses are included with zeros. peak_hourly_students is the
+    busiest hour's distinct student count.
+    """
+    stats = models.AccessStatsHourly
+    query = db.query(
+        stats.day, stats.hour, func.sum(stats.access_count), func.sum(stats.student_count)
+    ).filter(stats.day >= date_from, stats.day < date_to)
+    if plan_id is not None:
+        query = query.filter(stats.plan_id == plan_id)
+    hours = query.group_by(stats.day, stats.hour).all()
+    
+    bucket_of = ACCESS_TOTAL_PERIODS[period]
+    buckets = {}
+    day = date_from
+    while day < date_to:
+        buckets.setdefault(bucket_of(day), {"start": bucket_of(day), "accesses": 0, "peak_hourly_students": 0})
+        day += timedelta(days=1)
+    for day, _, accesses, students in hours:
+        bucket = buckets[bucket_of(day)]
+        bucket["accesses"] += accesses
+        bucket["peak_hourly_students"] = max(bucket["peak_hourly_students"], students)
+    return list(buckets.values())
+
+def get_total_accesses(db: Session, plan_id: Optional[int] = None) -> int:
+    """All-time access count from the hourly rollup (archived months included)"""
+    stats = models.AccessStatsHourly
+    query = db.query(func.coalesce(func.sum(stats.access_count), 0))
+    if plan_id is not None:
+        query = query.filter(stats.plan_id == plan_id)
+    return query.scalar()
+
+def _arrivals_within(dialect_name: str, seconds: int):
+    """
+    count(*) of the logs in the `seconds` up to each one. PostgreSQL ranges
+    over access_time itself, so ix_access_logs_access_time can supply the
+    window order; SQLite has no interval frames and ranges over the epoch.
+    """
+    log = models.AccessLog
+    if dialect_name == "postgresql":
+        return literal_column(
+            f"count(*) OVER (ORDER BY {log.__tablename__}.{log.access_time.key} "
+            f"RANGE BETWEEN INTERVAL '{int(seconds)} seconds' PRECEDING AND CURRENT ROW)"
+        )
+    return func.count().over(order_by=extract("epoch", log.access_time), range_=(-seconds, 0))
+
+def access_occupancy_stmt(dialect_name: str, start: datetime, end: datetime, plan_id: Optional[int] = None,
+                          visit_minutes: int = 90):
+    """Peak check-ins within visit_minutes of one another, per (dow, hour) of [start, end)"""
+    log = models.AccessLog
+    visit_seconds = visit_minutes * 60
+    # Logs from just before the range still count towards occupancy at its start
+    arrivals = select(
+        log.access_time.label("access_time"),
+        _arrivals_within(dialect_name, visit_seconds).label("occupancy")
+    ).where(
+        log.access_time >= start - timedelta(seconds=visit_seconds), log.access_time < end
+    )
+    if plan_id is not None:
+        arrivals = arrivals.join(
+            models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+        ).where(models.StudentPlan.plan_id == plan_id)
+    arrivals = arrivals.subquery()
+    arrival_weekday = extract("dow", arrivals.c.access_time)
+    arrival_hour = extract("hour", arrivals.c.access_time)
+    return select(arrival_weekday, arrival_hour, func.max(arrivals.c.occupancy)).where(
+        arrivals.c.access_time >= start
+    ).group_by(arrival_weekday, arrival_hour)
+
+def get_access_heatmap(db: Session, date_from: date, date_to: date, plan_id: Optional[int] = None,
+                       visit_minutes: int = 90) -> list:
+    """
+    Weekday x hour traffic over the UTC days [date_from, date_to). Weekdays
+    follow SQL dow numbering (0 = Sunday). For each cell:
+    - accesses and average_accesses (per occurrence of that weekday), from
+      the hourly rollup
+    - peak_occupancy, the most check-ins seen within visit_minutes of one
+      another, as an estimate of people inside assuming each visit lasts
+      visit_minutes; computed with a RANGE window over the access logs
+    Everything is aggregated in the database; only the 168 cells come back.
+    """
+    stats = models.AccessStatsHourly
+    weekday = extract("dow", stats.day)
+    traffic = db.query(weekday, stats.hour, func.sum(stats.access_count)).filter(
+        stats.day >= date_from, stats.day < date_to
+    )
+    if plan_id is not None:
+        traffic = traffic.filter(stats.plan_id == plan_id)
+    traffic = traffic.group_by(weekday, stats.hour).all()
     
-    # Get the active plan - this should be the ONLY plan we check
-    student_plan = get_active_student_plan(db, student_id)
+    start = datetime.combine(date_from, datetime.min.time())
+    end = datetime.combine(date_to, datetime.min.time())
+    occupancy = db.execute(
+        access_occupancy_stmt(db.get_bind().dialect.name, start, end, plan_id, visit_minutes)
+    ).all()
+    
+    # How many times each weekday occurs in the range, in dow numbering
+    occurrences = [0] * 7
+    day = date_from
+    while day < date_to:
+        occurrences[(day.weekday() + 1) % 7] += 1
+        day += timedelta(days=1)
     
-    if not student_plan:
-        return False, "No hay plan activo para este estudiante", None, 0
+    cells = {
+        (weekday, hour): {"weekday": weekday, "hour": hour, "accesses": 0, "average_accesses": 0.0, "peak_occupancy": 0}
+        for weekday in range(7) for hour in range(24)
+    }
+    for weekday, hour, accesses in traffic:
+        cell = cells[(int(weekday), int(hour))]
+        cell["accesses"] = accesses
+        cell["average_accesses"] = round(accesses / occurrences[int(weekday)], 2)
+    for weekday, hour, peak in occupancy:
+        cells[(int(weekday), int(hour))]["peak_occupancy"] = peak
+    return list(cells.values())
+
+DASHBOARD_RECENT = 5
+
+def get_dashboard_summary(db: Session, recent_limit: int = DASHBOARD_RECENT) -> dict:
+    """
+    Admin dashboard figures: all counts in one statement of scalar
+    subqueries plus the newest check-ins. Cached for a few seconds so
+    several open tabs share one computation.
+    """
+    cached = dashboard_cache.get(recent_limit)
+    if cached is not None:
+        return cached
     
-    # Double-check dates (should be redundant with improved get_active_student_plan)
     now = datetime.utcnow()
-    if now < student_plan.start_date or now > student_plan.end_date:
-        # This shouldn't happen with the improved function above
-        # But if it does, deactivate the plan
-        student_plan.is_active = False
-        student_plan.updated_at = now
-        db.commit()
-        return False, "El plan ha expirado", None, 0
+    today = datetime(now.year, now.month, now.day)
+    week_start = today - timedelta(days=today.weekday())
+    log = models.AccessLog
     
-    # Count accesses this month for THIS specific plan
-    current_month = now.month
-    current_year = now.year
-    monthly_accesses = get_monthly_access_count(db, student_plan.id, current_month, current_year)
+    def count(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
     
-    if monthly_accesses >= student_plan.plan.monthly_entries:
-        return False, "Has agotado tu límite mensual de ingresos", student_plan, 0
+    counts = db.execute(select(
+        count(models.Student).label("total_students"),
+        count(models.Plan).label("total_plans"),
+        count(
+            models.StudentPlan,
+            models.StudentPlan.is_active == True,
+            models.StudentPlan.start_date <= now,
+            models.StudentPlan.end_date >= now
+        ).label("active_plans"),
+        count(log, log.access_time >= today).label("today_accesses"),
+        count(log, log.access_time >= week_start).label("week_accesses")
+    )).one()
     
-    pending_monthly_accesses = student_plan.plan.monthly_entries - monthly_accesses
+    recent = db.execute(
+        select(log.id, log.access_time, log.student_id, models.Student.name, models.Student.document)
+        .join(models.Student, models.Student.id == log.student_id)
+        .order_by(log.access_time.desc(), log.id.desc())
+        .limit(recent_limit)
+    ).all()
     
-    return True, "Acceso permitido", student_plan, pending_monthly_accesses
+    summary = {
+        **counts._asdict(),
+        "recent_accesses": [{
+            "id": row.id,
+            "access_time": row.access_time,
+            "student": {"id": row.student_id, "name": row.name, "document": row.document}
+        } for row in recent],
+        "generated_at": now
+    }
+    dashboard_cache.set(recent_limit, summary)
+    return summary
+
+STUDENT_HISTORY_PAGE = 20
 
-def get_student_report(db: Session, student_id: int):
+def get_student_report(db: Session, student_id: int, history_limit: int = STUDENT_HISTORY_PAGE):
+    """
+    Student summary from aggregates plus the newest page of the access
+    history; older pages come from get_student_accesses
+    """
+    now = datetime.utcnow()
+    cache_key = ("student", student_id, (now.year, now.month), history_limit)
+    report = report_cache.get(cache_key)
+    if report is not None:
+        return report
+    
     student = get_student(db, student_id)
     if not student:
         return None
     
     current_plan = get_active_student_plan(db, student_id)
-    access_logs = db.query(models.AccessLog).filter(models.AccessLog.student_id == student_id).all()
     
-    total_accesses = len(access_logs)
+    # Lifetime and this month's totals from the usage counters
+    usage = models.StudentPlanUsage
+    total_accesses, monthly_accesses = db.query(
+        func.coalesce(func.sum(usage.access_count), 0),
+        func.coalesce(func.sum(usage.access_count).filter(
+            and_(usage.year == now.year, usage.month == now.month)
+        ), 0)
+    ).join(
+        models.StudentPlan, models.StudentPlan.id == usage.student_plan_id
+    ).filter(models.StudentPlan.student_id == student_id).one()
+    
     remaining_accesses = 0
     
     if current_plan:
-        now = datetime.utcnow()
-        monthly_accesses = get_monthly_access_count(db, current_plan.id, now.month, now.year)
-        remaining_accesses = max(0, current_plan.plan.monthly_entries - monthly_accesses)
+        current_plan_accesses = get_monthly_usage(db, current_plan.id, now.month, now.year)
+        remaining_accesses = max(0, current_plan.plan.monthly_entries - current_plan_accesses)
     
     # Convert current_plan to dict format for easier handling
     current_plan_data = None
@@ -250,26 +1187,22 @@ def get_student_report(db: Session, student_id: int):
             } if current_plan.plan else None
         }
     
-    # Convert access_logs to dict format
-    access_logs_data = []
-    for log in access_logs:
-        access_logs_data.append({
-            "id": log.id,
-            "student_id": log.student_id,
-            "student_plan_id": log.student_plan_id,
-            "access_time": log.access_time,
-            "notes": log.notes,
-            "student_plan": {
-                "id": log.student_plan.id,
-                "plan": {
-                    "id": log.student_plan.plan.id,
-                    "name": log.student_plan.plan.name,
-                    "monthly_entries": log.student_plan.plan.monthly_entries
-                } if log.student_plan.plan else None
-            } if log.student_plan else None
-        })
+    access_logs_data, access_logs_cursor = get_student_accesses(db, student_id, limit=history_limit)
     
-    return {
+    # Months whose logs live in the archive files, with the student's totals
+    archived_months = db.query(
+        usage.year, usage.month, func.sum(usage.access_count)
+    ).join(
+        models.StudentPlan, models.StudentPlan.id == usage.student_plan_id
+    ).join(
+        models.AccessLogArchive, and_(
+            models.AccessLogArchive.year == usage.year, models.AccessLogArchive.month == usage.month
+        )
+    ).filter(
+        models.StudentPlan.student_id == student_id
+    ).group_by(usage.year, usage.month).order_by(usage.year.desc(), usage.month.desc()).all()
+    
+    report = {
         "student": {
             "id": student.id,
             "name": student.name,
@@ -279,42 +1212,197 @@ def get_student_report(db: Session, student_id: int):
         },
         "current_plan": current_plan_data,
         "total_accesses": total_accesses,
+        "monthly_accesses": monthly_accesses,
         "remaining_accesses": remaining_accesses,
-        "access_logs": access_logs_data
+        "access_logs": access_logs_data,
+        "access_logs_next_cursor": access_logs_cursor,
+        "archived_months": [
+            {"year": year, "month": month, "accesses": accesses} for year, month, accesses in archived_months
+        ],
+        "generated_at": now
     }
+    report_cache.set(cache_key, report)
+    return report
 
-def get_plan_report(db: Session, plan_id: int):
+def get_student_accesses(db: Session, student_id: int, date_from: Optional[datetime] = None,
+                         date_to: Optional[datetime] = None, cursor: Optional[str] = None,
+                         limit: int = STUDENT_HISTORY_PAGE):
+    """
+    One page of a student's access history, newest first, with the plan
+    joined in the same query. date_from is inclusive and date_to exclusive.
+    Returns (items, next_cursor); raises ValueError for a bad cursor.
+    """
+    log = models.AccessLog
+    query = db.query(
+        log.id, log.student_id, log.student_plan_id, log.access_time, log.notes,
+        models.Plan.id.label("plan_id"), models.Plan.name.label("plan_name"),
+        models.Plan.monthly_entries.label("plan_monthly_entries")
+    ).outerjoin(
+        models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+    ).outerjoin(
+        models.Plan, models.Plan.id == models.StudentPlan.plan_id
+    ).filter(log.student_id == student_id)
+    
+    if date_from:
+        query = query.filter(log.access_time >= date_from)
+    if date_to:
+        query = query.filter(log.access_time < date_to)
+    if cursor:
+        query = query.filter(after_cursor((log.access_time, log.id), decode_cursor(cursor, 2)))
+    
+    rows = query.order_by(log.access_time.desc(), log.id.desc()).limit(limit + 1).all()
+    cursor_out = next_cursor(rows, limit, lambda row: (row.access_time, row.id))
+    
+    items = [{
+        "id": row.id,
+        "student_id": row.student_id,
+        "student_plan_id": row.student_plan_id,
+        "access_time": row.access_time,
+        "notes": row.notes,
+        "student_plan": {
+            "id": row.student_plan_id,
+            "plan": {
+                "id": row.plan_id,
+                "name": row.plan_name,
+                "monthly_entries": row.plan_monthly_entries
+            } if row.plan_id else None
+        } if row.student_plan_id else None
+    } for row in rows]
+    return items, cursor_out
+
+PLAN_HISTORY_PAGE = 20
+
+def get_plan_accesses(db: Session, plan_id: int, date_from: Optional[datetime] = None,
+                      date_to: Optional[datetime] = None, cursor: Optional[str] = None,
+                      limit: int = PLAN_HISTORY_PAGE):
+    """
+    One page of the accesses made under a plan, newest first, with the
+    student joined in. Same range and cursor rules as get_student_accesses.
+    """
+    log = models.AccessLog
+    query = db.query(
+        log.id, log.student_id, log.student_plan_id, log.access_time, log.notes,
+        models.Student.name.label("student_name"), models.Student.document.label("student_document")
+    ).join(
+        models.StudentPlan, models.StudentPlan.id == log.student_plan_id
+    ).join(
+        models.Student, models.Student.id == log.student_id
+    ).filter(models.StudentPlan.plan_id == plan_id)
+    
+    if date_from:
+        query = query.filter(log.access_time >= date_from)
+    if date_to:
+        query = query.filter(log.access_time < date_to)
+    if cursor:
+        query = query.filter(after_cursor((log.access_time, log.id), decode_cursor(cursor, 2)))
+    
+    rows = query.order_by(log.access_time.desc(), log.id.desc()).limit(limit + 1).all()
+    cursor_out = next_cursor(rows, limit, lambda row: (row.access_time, row.id))
+    
+    items = [{
+        "id": row.id,
+        "student_id": row.student_id,
+        "student_plan_id": row.student_plan_id,
+        "access_time": row.access_time,
+        "notes": row.notes,
+        "student": {
+            "id": row.student_id,
+            "name": row.student_name,
+            "document": row.student_document
+        }
+    } for row in rows]
+    return items, cursor_out
+
+def get_plan_monthly_accesses(db: Session, plan_id: int, month: int, year: int) -> int:
+    """Accesses under a plan in a month, summed from the usage counters"""
+    return db.query(
+        func.coalesce(func.sum(models.StudentPlanUsage.access_count), 0)
+    ).join(
+        models.StudentPlan, models.StudentPlan.id == models.StudentPlanUsage.student_plan_id
+    ).filter(
+        models.StudentPlan.plan_id == plan_id,
+        models.StudentPlanUsage.year == year,
+        models.StudentPlanUsage.month == month
+    ).scalar()
+
+PLAN_REPORT_SORTS = {
+    "usage": lambda monthly_accesses: monthly_accesses,
+    "name": lambda _: models.Student.name,
+    "start_date": lambda _: models.StudentPlan.start_date,
+}
+
+def get_plan_report(db: Session, plan_id: int, skip: int = 0, limit: int = 100,
+                    sort: str = "usage", descending: bool = True):
+    """
+    Plan report built from a fixed number of aggregate queries. This
+    month's usage comes from the student_plan_usage counters joined onto
+    the page of student plans, so cost does not grow with enrolments.
+    """
+    now = datetime.utcnow()
+    cache_key = ("plan", plan_id, (now.year, now.month), skip, limit, sort, descending)
+    report = report_cache.get(cache_key)
+    if report is not None:
+        return report
+    
     plan = get_plan(db, plan_id)
     if not plan:
         return None
     
-    # Get active students with this plan
-    active_students = db.query(models.StudentPlan).filter(
-        and_(
-            models.StudentPlan.plan_id == plan_id,
-            models.StudentPlan.is_active == True,
-            models.StudentPlan.start_date <= datetime.utcnow(),
-            models.StudentPlan.end_date >= datetime.utcnow()
-        )
-    ).count()
+    active_filter = and_(
+        models.StudentPlan.plan_id == plan_id,
+        models.StudentPlan.is_active == True,
+        models.StudentPlan.start_date <= now,
+        models.StudentPlan.end_date >= now
+    )
+    this_month_usage = and_(
+        models.StudentPlanUsage.student_plan_id == models.StudentPlan.id,
+        models.StudentPlanUsage.year == now.year,
+        models.StudentPlanUsage.month == now.month
+    )
+    monthly_accesses = func.coalesce(models.StudentPlanUsage.access_count, 0)
+    
+    # Get active students with this plan and their average usage this month
+    active_students, average_accesses = db.query(
+        func.count(models.StudentPlan.id), func.avg(monthly_accesses)
+    ).outerjoin(models.StudentPlanUsage, this_month_usage).filter(active_filter).one()
     
     # Get total accesses for this plan
-    total_accesses = db.query(models.AccessLog).join(models.StudentPlan).filter(
+    total_accesses = db.query(
+        func.coalesce(func.sum(models.StudentPlanUsage.access_count), 0)
+    ).join(
+        models.StudentPlan, models.StudentPlan.id == models.StudentPlanUsage.student_plan_id
+    ).filter(models.StudentPlan.plan_id == plan_id).scalar()
+    
+    students_total = db.query(func.count(models.StudentPlan.id)).filter(
         models.StudentPlan.plan_id == plan_id
-    ).count()
+    ).scalar()
     
-    # Get students with this plan (with full relationship data)
-    students_with_plan = db.query(models.StudentPlan).filter(
+    # Get one page of students with this plan, student loaded in the same query
+    sort_column = PLAN_REPORT_SORTS[sort](monthly_accesses)
+    students_with_plan = db.query(models.StudentPlan, monthly_accesses).join(
+        models.StudentPlan.student
+    ).outerjoin(
+        models.StudentPlanUsage, this_month_usage
+    ).options(
+        contains_eager(models.StudentPlan.student)
+    ).filter(
         models.StudentPlan.plan_id == plan_id
-    ).all()
+    ).order_by(
+        sort_column.desc() if descending else sort_column.asc(),
+        models.StudentPlan.id
+    ).offset(skip).limit(limit).all()
+    
+    plan_data = {
+        "id": plan.id,
+        "name": plan.name,
+        "monthly_entries": plan.monthly_entries,
+        "created_at": plan.created_at,
+        "updated_at": plan.updated_at
+    }
     
     # Convert to dict format for easier handling
     students_with_plan_data = []
-    for sp in students_with_plan:
-        # Count monthly accesses for this student plan
-        now = datetime.utcnow()
-        monthly_accesses = get_monthly_access_count(db, sp.id, now.month, now.year)
-        
+    for sp, sp_monthly_accesses in students_with_plan:
         students_with_plan_data.append({
             "id": sp.id,
             "student_id": sp.student_id,
@@ -322,32 +1410,31 @@ def get_plan_report(db: Session, plan_id: int):
             "start_date": sp.start_date,
             "end_date": sp.end_date,
             "is_active": sp.is_active,
-            "monthly_accesses": monthly_accesses,
+            "monthly_accesses": sp_monthly_accesses,
             "student": {
                 "id": sp.student.id,
                 "name": sp.student.name,
                 "document": sp.student.document,
                 "created_at": sp.student.created_at,
                 "updated_at": sp.student.updated_at
-            } if sp.student else None,
-            "plan": {
-                "id": sp.plan.id,
-                "name": sp.plan.name,
-                "monthly_entries": sp.plan.monthly_entries,
-                "created_at": sp.plan.created_at,
-                "updated_at": sp.plan.updated_at
-            } if sp.plan else None
+            },
+            "plan": plan_data
         })
     
-    return {
-        "plan": {
-            "id": plan.id,
-            "name": plan.name,
-            "monthly_entries": plan.monthly_entries,
-            "created_at": plan.created_at,
-            "updated_at": plan.updated_at
-        },
+    average_usage = 0
+    if average_accesses is not None:
+        average_usage = round(float(average_accesses) / plan.monthly_entries * 100)
+    
+    report = {
+        "plan": plan_data,
         "active_students": active_students,
         "total_accesses": total_accesses,
-        "students_with_plan": students_with_plan_data
+        "average_usage": average_usage,
+        "students_total": students_total,
+        "skip": skip,
+        "limit": limit,
+        "students_with_plan": students_with_plan_data,
+        "generated_at": now
     }
+    report_cache.set(cache_key, report)
+    return report
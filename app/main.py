@@ -1,25 +1,40 @@
 # app/main.py
+import asyncio
 from fastapi import FastAPI, Depends, HTTPException, Request, Form
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.security import HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
-from app.database import get_db, engine
+from app.database import get_db, get_async_db, engine
 from app.models import Base
-from app.auth import authenticate_admin, create_access_token, get_current_admin, create_admin_user
+from app.auth import authenticate_admin_async, create_access_token, get_current_admin, create_admin_user
 from app.schemas import Token, UserLogin, StudentAccess, AccessLogCreate
-from app.crud import get_student_by_document, can_student_access, create_access_log
+from app.async_crud import check_in_student
 from app.config import settings
 from app.routers import admin, students, plans, student_plans, access_logs, reports
-from app import schemas
+from app import crud, schemas, tasks
+from app.compression import CompressionMiddleware
+from app.profiling import SQLProfilerMiddleware, recent_profiles
 
 # Create tables
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI(title="Sistema de Control de Acceso")
 
+if settings.compression_minimum_size > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        gzip_level=settings.compression_gzip_level,
+        brotli_quality=settings.compression_brotli_quality
+    )
+
+if settings.sql_profiling:
+    app.add_middleware(SQLProfilerMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -37,6 +52,9 @@ app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 # Security
 security = HTTPBearer()
 
+# Background jobs started with the app
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
     """Create default admin user on startup"""
@@ -45,6 +63,21 @@ async def startup_event():
         create_admin_user(db)
     finally:
         db.close()
+    
+    if settings.plan_sweep_interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(
+            tasks.run_periodically(tasks.sweep_expired_plans, settings.plan_sweep_interval_seconds)
+        ))
+    if settings.partition_maintenance_interval_seconds > 0:
+        background_tasks.append(asyncio.create_task(
+            tasks.run_periodically(tasks.maintain_access_log_partitions, settings.partition_maintenance_interval_seconds)
+        ))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
 
 def verify_admin_session(request: Request):
     """Verify admin session from cookie for HTML pages"""
@@ -62,11 +95,11 @@ async def admin_login_page(request: Request):
     return templates.TemplateResponse("login.html", {"request": request, "admin": True})
 
 @app.post("/admin/login")
-async def admin_login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def admin_login(request: Request, username: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_async_db)):
     print(f"=== DEBUG admin_login ===")
     print(f"Username: {username}")
     
-    admin = authenticate_admin(db, username, password)
+    admin = await authenticate_admin_async(db, username, password)
     if not admin:
         print("Authentication failed")
         return templates.TemplateResponse("login.html", {
@@ -143,40 +176,28 @@ async def student_access_page(request: Request):
 async def student_access(
     request: Request,
     document: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    student = get_student_by_document(db, document)
-    if not student:
+    result = await check_in_student(db, document)
+    if not result.student:
         return templates.TemplateResponse("student/access.html", {
             "request": request,
-            "error": "Estudiante no encontrado"
+            "error": result.message
         })
     
-    can_access, message, student_plan, pending_monthly_accesses = can_student_access(db, student.id)
-    
-    if can_access:
-        # Create access log using the proper schema
-        access_log_data = schemas.AccessLogCreate(
-            student_id=student.id,
-            student_plan_id=student_plan.id,
-            notes="Acceso registrado automáticamente"
-        )
-        create_access_log(db, access_log_data)
-
-        pending = pending_monthly_accesses - 1
-        
+    if result.allowed:
         return templates.TemplateResponse("student/access.html", {
             "request": request,
-            "success": f"¡Bienvenido {student.name}! Acceso permitido.",
-            "student": student,
-            "plan": student_plan.plan if student_plan else None,
-            "pending": pending
+            "success": f"¡Bienvenido {result.student.name}! Acceso permitido.",
+            "student": result.student,
+            "plan": result.student_plan.plan,
+            "pending": result.remaining
         })
     else:
         return templates.TemplateResponse("student/access.html", {
             "request": request,
-            "error": message,
-            "student": student
+            "error": result.message,
+            "student": result.student
         })
 
 @app.get("/reports/student/{student_id}", response_class=HTMLResponse)
@@ -198,7 +219,7 @@ if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
 @app.post("/debug/create-test-data")
-async def create_test_data(db: Session = Depends(get_db)):
+def create_test_data(db: Session = Depends(get_db)):
     """Create test data for debugging"""
     try:
         # Create test students
@@ -263,6 +284,15 @@ async def create_test_data(db: Session = Depends(get_db)):
         print(f"Error creating test data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/debug/sql-profile")
+async def sql_profile(limit: int = 50, over_budget: bool = False,
+                      authorized: bool = Depends(students.verify_admin_api)):
+    """Recent per-request SQL profiles, newest first (requires SQL_PROFILING=true)"""
+    if not settings.sql_profiling:
+        raise HTTPException(status_code=404, detail="El perfilador SQL no está habilitado")
+    profiles = [p for p in reversed(recent_profiles) if p["over_budget"] or not over_budget]
+    return profiles[:limit]
+
 @app.post("/logout")
 async def logout():
     response = RedirectResponse(url="/", status_code=302)
@@ -1,21 +1,48 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Text
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Boolean, Text, Index, DDL, event, text
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from app.config import settings
 from app.database import Base
 
+# crud queries declare the relationships they serialize (joinedload /
+# selectinload); with SQL_RAISE_ON_LAZY_LOAD any load they forgot raises
+LAZY = "raise_on_sql" if settings.sql_raise_on_lazy_load else "select"
+
+# Timestamps are naive UTC from Python on insert and update alike, like the
+# values crud sets itself; the database's now() is local time on
+# PostgreSQL and would skew max(updated_at) in the list ETags
+
 class Student(Base):
     __tablename__ = "students"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     document = Column(String(50), unique=True, nullable=False, index=True)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Indexed so max(updated_at) for list ETags (crud.get_*_version) is a lookup
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
-    student_plans = relationship("StudentPlan", back_populates="student")
-    access_logs = relationship("AccessLog", back_populates="student")
+    student_plans = relationship("StudentPlan", back_populates="student", lazy=LAZY)
+    access_logs = relationship("AccessLog", back_populates="student", lazy=LAZY)
+    
+    __table_args__ = (
+        # Student search (crud.search_students, migration 007): trigram
+        # index for name substrings, pattern_ops indexes for prefixes.
+        # PostgreSQL only; SQLite scans the table.
+        Index(
+            "ix_students_name_trgm", text("lower(name) gin_trgm_ops"), postgresql_using="gin"
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_students_name_prefix", text("lower(name) text_pattern_ops")).ddl_if(dialect="postgresql"),
+        Index("ix_students_document_prefix", text("document text_pattern_ops")).ddl_if(dialect="postgresql"),
+    )
+
+# gin_trgm_ops comes from pg_trgm; create_all needs it before the index
+event.listen(
+    Student.__table__, "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
 
 class Plan(Base):
     __tablename__ = "plans"
@@ -23,11 +50,11 @@ class Plan(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(100), nullable=False)
     monthly_entries = Column(Integer, nullable=False)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
-    student_plans = relationship("StudentPlan", back_populates="plan")
+    student_plans = relationship("StudentPlan", back_populates="plan", lazy=LAZY)
 
 class StudentPlan(Base):
     __tablename__ = "student_plans"
@@ -38,26 +65,88 @@ class StudentPlan(Base):
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=func.now())
-    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
-    student = relationship("Student", back_populates="student_plans")
-    plan = relationship("Plan", back_populates="student_plans")
-    access_logs = relationship("AccessLog", back_populates="student_plan")
+    student = relationship("Student", back_populates="student_plans", lazy=LAZY)
+    plan = relationship("Plan", back_populates="student_plans", lazy=LAZY)
+    access_logs = relationship("AccessLog", back_populates="student_plan", lazy=LAZY)
+    
+    __table_args__ = (
+        # Active plan lookup on check-in and in get_active_student_plan
+        Index(
+            "ix_student_plans_active_lookup", "student_id", "start_date", "end_date",
+            postgresql_where=is_active == True, sqlite_where=is_active == True
+        ),
+        # Expired plan sweep
+        Index(
+            "ix_student_plans_active_end_date", "end_date",
+            postgresql_where=is_active == True, sqlite_where=is_active == True
+        ),
+        Index("ix_student_plans_plan_id", "plan_id"),
+    )
+
+class StudentPlanUsage(Base):
+    """Per-month access counter for a student plan, kept in step with access_logs"""
+    __tablename__ = "student_plan_usage"
+    
+    student_plan_id = Column(Integer, ForeignKey("student_plans.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    access_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class AccessStatsHourly(Base):
+    """Accesses and distinct students per plan and UTC hour, kept in step with access_logs"""
+    __tablename__ = "access_stats_hourly"
+    
+    plan_id = Column(Integer, ForeignKey("plans.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    hour = Column(Integer, primary_key=True)
+    access_count = Column(Integer, nullable=False, default=0)
+    student_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # Totals across all plans for a date range
+        Index("ix_access_stats_hourly_day", "day"),
+    )
 
 class AccessLog(Base):
+    """
+    On PostgreSQL this table is range-partitioned by access_time month
+    (migration 005) with primary key (id, access_time); id stays unique
+    through its sequence. Filter on access_time ranges so the planner
+    can prune partitions.
+    """
     __tablename__ = "access_logs"
     
     id = Column(Integer, primary_key=True, index=True)
     student_id = Column(Integer, ForeignKey("students.id"), nullable=False)
     student_plan_id = Column(Integer, ForeignKey("student_plans.id"), nullable=False)
-    access_time = Column(DateTime, default=func.now())
+    access_time = Column(DateTime, nullable=False, default=datetime.utcnow)
     notes = Column(Text, nullable=True)
     
     # Relationships
-    student = relationship("Student", back_populates="access_logs")
-    student_plan = relationship("StudentPlan", back_populates="access_logs")
+    student = relationship("Student", back_populates="access_logs", lazy=LAZY)
+    student_plan = relationship("StudentPlan", back_populates="access_logs", lazy=LAZY)
+    
+    __table_args__ = (
+        Index("ix_access_logs_student_time", "student_id", "access_time"),
+        Index("ix_access_logs_student_plan_time", "student_plan_id", "access_time"),
+        Index("ix_access_logs_access_time", "access_time"),
+    )
+
+class AccessLogArchive(Base):
+    """A month of access_logs moved to a file under settings.archive_dir"""
+    __tablename__ = "access_log_archives"
+    
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    path = Column(String(255), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
 
 class Admin(Base):
     __tablename__ = "admins"
@@ -66,4 +155,4 @@ class Admin(Base):
     username = Column(String(50), unique=True, nullable=False)
     hashed_password = Column(String(100), nullable=False)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=func.now())
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,93 @@
+# app/pagination.py
+# Opaque cursors for keyset pagination. A cursor carries the sort key of
+# the last row of a page; the next page starts strictly after it, so
+# deep pages cost the same as the first one and rows inserted meanwhile
+# do not shift the window.
+import base64
+import binascii
+import json
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional, Sequence
+from sqlalchemy import and_, or_
+from starlette.requests import Request
+from starlette.responses import Response
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+    total: Optional[int] = None
+
+def encode_cursor(*values) -> str:
+    payload = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = tuple(
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in payload
+        )
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise ValueError("Cursor inválido")
+    if len(values) != size:
+        raise ValueError("Cursor inválido")
+    return values
+
+def after_cursor(columns: Sequence, values: Sequence, descending: bool = True):
+    """
+    Row-value comparison (columns) < values, or > when ascending, spelled
+    out with AND/OR so it works on every backend and stays index friendly
+    """
+    clauses = []
+    for position, column in enumerate(columns):
+        beyond = column < values[position] if descending else column > values[position]
+        clauses.append(and_(*[columns[i] == values[i] for i in range(position)], beyond))
+    return or_(*clauses)
+
+def next_cursor(rows: list, limit: int, key) -> Optional[str]:
+    """
+    Callers fetch limit + 1 rows; when the extra row is there, trim it and
+    return the cursor for the last row kept
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    return encode_cursor(*key(rows[-1]))
+
+def paginate(query, columns: Sequence, cursor: Optional[str], limit: int, descending: bool = False,
+             with_total: bool = False, skip: int = 0) -> Page:
+    """
+    Order `query` by `columns` (a unique key, ties broken by the last
+    column) and return the page after `cursor`. The total, when asked for,
+    counts the whole filtered query and costs one extra statement. `skip`
+    is the legacy offset and only applies without a cursor.
+    Raises ValueError for a bad cursor.
+    """
+    total = query.order_by(None).count() if with_total else None
+    if cursor:
+        query = query.filter(after_cursor(columns, decode_cursor(cursor, len(columns)), descending))
+    query = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if skip and not cursor:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    cursor_out = next_cursor(rows, limit, lambda row: tuple(getattr(row, column.key) for column in columns))
+    return Page(rows, cursor_out, total)
+
+def set_page_headers(response: Response, request: Request, page: Page) -> None:
+    """Expose a list page's cursor and total as X-Next-Cursor, Link and X-Total-Count"""
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+        url = request.url.remove_query_params("skip").include_query_params(cursor=page.next_cursor)
+        response.headers["Link"] = f'<{url}>; rel="next"'
+    if page.total is not None:
+        response.headers["X-Total-Count"] = str(page.total)
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # access_time and plan dates are stored as naive UTC
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,127 @@
+# app/profiling.py
+# Opt-in per-request SQL profiler (SQL_PROFILING=true). Statements are
+# captured with SQLAlchemy engine events and attributed to the request
+# through a context variable, which also follows sync handlers into the
+# thread pool and async sessions into their greenlets.
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER_LIST = re.compile(r"(\?|%\(\w+\)s|\$\d+|:\w+)(\s*,\s*(\?|%\(\w+\)s|\$\d+|:\w+))*")
+_WHITESPACE = re.compile(r"\s+")
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so IN-lists of any length and formatting compare equal"""
+    return _PLACEHOLDER_LIST.sub("?", _WHITESPACE.sub(" ", statement).strip())
+
+class RequestProfile:
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.statements = []
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration: float):
+        with self._lock:
+            self.statements.append((statement_shape(statement), duration))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def total_ms(self) -> float:
+        return sum(duration for _, duration in self.statements) * 1000
+
+    def suspected_n_plus_one(self) -> list:
+        shapes = Counter(shape for shape, _ in self.statements)
+        return [
+            {"statement": shape, "count": count}
+            for shape, count in shapes.most_common()
+            if count >= settings.sql_n_plus_one_threshold
+        ]
+
+    def summary(self) -> dict:
+        slowest = sorted(self.statements, key=lambda item: item[1], reverse=True)[:settings.sql_profile_slowest]
+        return {
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "statement_count": self.count,
+            "db_time_ms": round(self.total_ms, 3),
+            "over_budget": self.count > settings.sql_statement_budget,
+            "slowest": [{"statement": shape, "ms": round(duration * 1000, 3)} for shape, duration in slowest],
+            "suspected_n_plus_one": self.suspected_n_plus_one()
+        }
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("sql_profile", default=None)
+recent_profiles = deque(maxlen=settings.sql_profile_history)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_profile.get() is not None:
+        context._sql_profile_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = getattr(context, "_sql_profile_started", None)
+    if profile is not None and started is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+def install_engine_listeners():
+    """Listen on every Engine, including the sync core of the async engine"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+class SQLProfilerMiddleware:
+    """
+    Records statement count, DB time and slowest statements per request,
+    exposes them as X-SQL-* response headers and in recent_profiles, and
+    logs a warning for routes over the statement budget
+    """
+
+    def __init__(self, app):
+        self.app = app
+        install_engine_listeners()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/static"):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"])
+        token = _current_profile.set(profile)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                suspects = profile.suspected_n_plus_one()
+                headers = list(message.get("headers", []))
+                headers.append((b"x-sql-count", str(profile.count).encode()))
+                headers.append((b"x-sql-time-ms", f"{profile.total_ms:.3f}".encode()))
+                if suspects:
+                    headers.append((b"x-sql-suspected-n-plus-one", str(len(suspects)).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_profile.reset(token)
+            summary = profile.summary()
+            recent_profiles.append(summary)
+            if summary["over_budget"]:
+                logger.warning(
+                    "%s %s ran %d SQL statements (budget %d, %.1f ms); suspected N+1: %s",
+                    profile.method, profile.path, profile.count, settings.sql_statement_budget,
+                    profile.total_ms, [suspect["statement"][:120] for suspect in summary["suspected_n_plus_one"]]
+                )
@@ -1,12 +1,30 @@
 # app/routers/access_logs.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
-from app import crud, schemas
+from datetime import datetime, timedelta
+from typing import List, Optional, Union
+from urllib.parse import urlencode
+import csv
+import io
+import json
+import secrets
+from jose import JWTError, jwt
+from app.auth import create_access_token
+from app.conditional import not_modified
+from app.config import settings
+from app.database import SessionLocal, get_db, get_async_db
+from app.pagination import naive_utc, set_page_headers
+from app import async_crud, crud, schemas
 
 router = APIRouter()
 
+# Lifetime of an export link: the token is checked once, when the download
+# starts, so it only has to outlive the click
+EXPORT_LINK_SECONDS = 60
+EXPORT_TOKEN_SCOPE = "access-log-export"
+
 def verify_admin_api(authorization: Optional[str] = Header(None)):
     """Verify admin for API calls"""
     if not authorization:
@@ -29,10 +47,38 @@ def verify_admin_api(authorization: Optional[str] = Header(None)):
             detail="Invalid token"
         )
 
-@router.get("/", response_model=List[schemas.AccessLog])
-def read_access_logs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
-    access_logs = crud.get_access_logs(db, skip=skip, limit=limit)
-    return access_logs
+@router.get("/", response_model=Union[List[schemas.AccessLog], List[schemas.AccessLogCompact]])
+def read_access_logs(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    include_total: bool = False,
+    view: str = Query("full", pattern="^(full|compact)$"),
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """
+    One page, newest first; the next one is at the X-Next-Cursor / Link
+    header. view=compact returns flat ids and names instead of nested objects.
+    """
+    unchanged = not_modified(request, response, crud.get_access_logs_version(db))
+    if unchanged:
+        return unchanged
+    try:
+        page = crud.get_access_logs(
+            db, skip=skip, limit=limit, cursor=cursor, with_total=include_total,
+            date_from=naive_utc(date_from), date_to=naive_utc(date_to), compact=view == "compact"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_page_headers(response, request, page)
+    if view == "compact":
+        return [schemas.AccessLogCompact.model_validate(row) for row in page.items]
+    return page.items
 
 @router.post("/", response_model=schemas.AccessLog)
 def create_access_log(access_log: schemas.AccessLogCreate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
@@ -46,36 +92,141 @@ def create_access_log(access_log: schemas.AccessLogCreate, db: Session = Depends
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+def verify_kiosk(x_kiosk_key: Optional[str] = Header(None)):
+    """Batches can backdate accesses, so kiosks authenticate when KIOSK_API_KEY is set"""
+    if settings.kiosk_api_key and not secrets.compare_digest(x_kiosk_key or "", settings.kiosk_api_key):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Kiosco no autorizado")
+    return True
+
+@router.post("/batch", response_model=List[schemas.CheckInEventResult])
+def student_access_batch(batch: schemas.CheckInBatch, db: Session = Depends(get_db),
+                         authorized: bool = Depends(verify_kiosk)):
+    return crud.check_in_batch(
+        db, batch.events,
+        max_age=timedelta(hours=settings.check_in_replay_hours),
+        max_skew=timedelta(seconds=settings.check_in_clock_skew_seconds)
+    )
+
+def _export_chunks(date_from: Optional[datetime], date_to: Optional[datetime], export_format: str):
+    """
+    Encode the export chunk by chunk. The generator owns its session: it
+    runs while the response is being sent, after the request's
+    dependencies are gone.
+    """
+    db = SessionLocal()
+    try:
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(crud.EXPORT_COLUMNS)
+            for rows in crud.iter_access_log_export(db, date_from, date_to):
+                writer.writerows(rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for rows in crud.iter_access_log_export(db, date_from, date_to):
+                yield "".join(
+                    json.dumps(dict(zip(crud.EXPORT_COLUMNS, row)), default=datetime.isoformat, ensure_ascii=False) + "\n"
+                    for row in rows
+                )
+    finally:
+        db.close()
+
+@router.post("/export-link", response_model=schemas.ExportLink)
+def create_export_link(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """
+    Signed, short-lived URL for GET /export. The admin page opens it as a
+    plain link, so the browser streams the file to disk instead of holding
+    it in memory.
+    """
+    params = {"format": format}
+    params.update({
+        name: value.isoformat() for name, value in (("from", naive_utc(date_from)), ("to", naive_utc(date_to))) if value
+    })
+    token = create_access_token(
+        {"sub": EXPORT_TOKEN_SCOPE, **params}, expires_delta=timedelta(seconds=EXPORT_LINK_SECONDS)
+    )
+    return schemas.ExportLink(
+        url=f"/api/access-logs/export?{urlencode({'token': token})}", expires_in=EXPORT_LINK_SECONDS
+    )
+
+def _export_link_params(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Enlace de exportación inválido o vencido")
+    if payload.get("sub") != EXPORT_TOKEN_SCOPE:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Enlace de exportación inválido o vencido")
+    return payload
+
+@router.get("/export")
+def export_access_logs(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    token: Optional[str] = None,
+    authorization: Optional[str] = Header(None)
+):
+    """
+    Stream every access log in [from, to) as CSV or NDJSON. Authorized by
+    the Authorization header, or by the token of an export link, whose
+    signed range and format replace the query parameters.
+    """
+    if token:
+        params = _export_link_params(token)
+        format = params["format"]
+        date_from, date_to = (
+            datetime.fromisoformat(params[name]) if params.get(name) else None for name in ("from", "to")
+        )
+    else:
+        verify_admin_api(authorization)
+    date_from, date_to = naive_utc(date_from), naive_utc(date_to)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    label = "_".join(value.strftime("%Y%m%d") for value in (date_from, date_to) if value) or "todos"
+    return StreamingResponse(
+        _export_chunks(date_from, date_to, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="accesos_{label}.{format}"'}
+    )
+
 @router.get("/{access_log_id}", response_model=schemas.AccessLog)
-def read_access_log(access_log_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
+def read_access_log(access_log_id: int, request: Request, response: Response, db: Session = Depends(get_db),
+                    authorized: bool = Depends(verify_admin_api)):
     db_access_log = crud.get_access_log(db, access_log_id=access_log_id)
     if db_access_log is None:
         raise HTTPException(status_code=404, detail="Registro de acceso no encontrado")
-    return db_access_log
+    # A log never changes; only the student and plan nested in it do
+    stamps = (
+        db_access_log.access_time, db_access_log.student.updated_at,
+        db_access_log.student_plan.updated_at, db_access_log.student_plan.plan.updated_at
+    )
+    return not_modified(request, response, stamps, max(stamps)) or db_access_log
 
 @router.post("/student-access")
-def student_access(student_access: schemas.StudentAccess, db: Session = Depends(get_db)):
-    student = crud.get_student_by_document(db, student_access.document)
-    if not student:
-        raise HTTPException(status_code=404, detail="Estudiante no encontrado")
-    
-    can_access, message, student_plan = crud.can_student_access(db, student.id)
-    
-    if not can_access:
-        raise HTTPException(status_code=403, detail=message)
-    
-    # Create access log
-    access_log_data = schemas.AccessLogCreate(
-        student_id=student.id,
-        student_plan_id=student_plan.id,
-        notes="Acceso registrado automáticamente"
-    )
+async def student_access(student_access: schemas.StudentAccess, db: AsyncSession = Depends(get_async_db)):
+    result = await async_crud.check_in_student(db, student_access.document)
+    if not result.student:
+        raise HTTPException(status_code=404, detail=result.message)
     
-    access_log = crud.create_access_log(db, access_log_data)
+    if not result.allowed:
+        raise HTTPException(status_code=403, detail=result.message)
     
     return {
-        "message": f"¡Bienvenido {student.name}! Acceso permitido.",
-        "student": student,
-        "plan": student_plan.plan,
-        "access_log": access_log
-    }
\ No newline at end of file
+        "message": f"¡Bienvenido {result.student.name}! Acceso permitido.",
+        "student": schemas.Student.model_validate(result.student),
+        "plan": schemas.Plan.model_validate(result.student_plan.plan),
+        "access_log": {
+            "id": result.access_log.id,
+            "student_plan_id": result.access_log.student_plan_id,
+            "access_time": result.access_log.access_time,
+            "notes": result.access_log.notes
+        },
+        "remaining_accesses": result.remaining
+    }
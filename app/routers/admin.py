@@ -1,17 +1,18 @@
 # app/routers/admin.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
-from app.database import get_db
-from app.auth import authenticate_admin, create_access_token, get_current_admin
+from app.database import get_async_db
+from app.auth import authenticate_admin_async, create_access_token, get_current_admin
 from app.schemas import Token, UserLogin
 from app.config import settings
+from app.cache import cache_stats
 
 router = APIRouter()
 
 @router.post("/login", response_model=Token)
-async def login_for_access_token(user_login: UserLogin, db: Session = Depends(get_db)):
-    admin = authenticate_admin(db, user_login.username, user_login.password)
+async def login_for_access_token(user_login: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    admin = await authenticate_admin_async(db, user_login.username, user_login.password)
     if not admin:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,3 +28,7 @@ async def login_for_access_token(user_login: UserLogin, db: Session = Depends(ge
 @router.get("/me")
 async def read_users_me(current_admin = Depends(get_current_admin)):
     return current_admin
+
+@router.get("/cache-stats")
+async def read_cache_stats(current_admin = Depends(get_current_admin)):
+    return cache_stats()
@@ -1,8 +1,10 @@
 # app/routers/plans.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.conditional import not_modified
 from app.database import get_db
+from app.pagination import set_page_headers
 from app import crud, schemas
 
 router = APIRouter()
@@ -30,20 +32,38 @@ def verify_admin_api(authorization: Optional[str] = Header(None)):
         )
 
 @router.get("/", response_model=List[schemas.Plan])
-def read_plans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
-    plans = crud.get_plans(db, skip=skip, limit=limit)
-    return plans
+def read_plans(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    include_total: bool = False,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """One page; the next one is at the X-Next-Cursor / Link header"""
+    unchanged = not_modified(request, response, crud.get_plans_version(db))
+    if unchanged:
+        return unchanged
+    try:
+        page = crud.get_plans(db, skip=skip, limit=limit, cursor=cursor, with_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_page_headers(response, request, page)
+    return page.items
 
 @router.post("/", response_model=schemas.Plan)
 def create_plan(plan: schemas.PlanCreate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
     return crud.create_plan(db=db, plan=plan)
 
 @router.get("/{plan_id}", response_model=schemas.Plan)
-def read_plan(plan_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
+def read_plan(plan_id: int, request: Request, response: Response, db: Session = Depends(get_db),
+              authorized: bool = Depends(verify_admin_api)):
     db_plan = crud.get_plan(db, plan_id=plan_id)
     if db_plan is None:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
-    return db_plan
+    return not_modified(request, response, (db_plan.updated_at,), db_plan.updated_at) or db_plan
 
 @router.put("/{plan_id}", response_model=schemas.Plan)
 def update_plan(plan_id: int, plan: schemas.PlanUpdate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
@@ -1,9 +1,12 @@
 # app/routers/reports.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request, Response, status, Header
 from sqlalchemy.orm import Session
+from datetime import date, datetime, timedelta
 from typing import Optional
+from app.conditional import not_modified
 from app.database import get_db
-from app import crud
+from app.pagination import naive_utc
+from app import archive, crud
 
 router = APIRouter()
 
@@ -29,16 +32,177 @@ def verify_admin_api(authorization: Optional[str] = Header(None)):
             detail="Invalid token"
         )
 
+@router.get("/dashboard")
+def get_dashboard(
+    request: Request,
+    response: Response,
+    recent: int = Query(crud.DASHBOARD_RECENT, ge=1, le=50),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """Counts and latest check-ins for the admin dashboard"""
+    summary = crud.get_dashboard_summary(db, recent)
+    return not_modified(request, response, (summary["generated_at"],), summary["generated_at"]) or summary
+
+def _freshness(request: Request, response: Response, report: dict) -> Optional[Response]:
+    """
+    Expose when a (possibly cached) report was computed. Cached reports
+    are dropped on every write they depend on, so the computation time
+    also validates the client's copy; returns the 304 when it is current.
+    """
+    response.headers["X-Report-Generated-At"] = report["generated_at"].isoformat()
+    response.headers["Age"] = str(max(0, int((datetime.utcnow() - report["generated_at"]).total_seconds())))
+    return not_modified(request, response, (report["generated_at"],), report["generated_at"])
+
 @router.get("/student/{student_id}")
-def get_student_report(student_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
+def get_student_report(student_id: int, request: Request, response: Response, db: Session = Depends(get_db),
+                       authorized: bool = Depends(verify_admin_api)):
     report = crud.get_student_report(db, student_id)
     if not report:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
-    return report
+    return _freshness(request, response, report) or report
+
+@router.get("/student/{student_id}/accesses")
+def get_student_accesses(
+    student_id: int,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.STUDENT_HISTORY_PAGE, ge=1, le=200),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """Student access history, newest first, paginated with next_cursor"""
+    if not crud.get_student(db, student_id):
+        raise HTTPException(status_code=404, detail="Estudiante no encontrado")
+    try:
+        items, next_cursor = crud.get_student_accesses(
+            db, student_id, naive_utc(date_from), naive_utc(date_to), cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+@router.get("/student/{student_id}/archive/{year}/{month}")
+def get_archived_student_accesses(
+    student_id: int,
+    year: int,
+    month: int = Path(..., ge=1, le=12),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """A student's accesses in an archived month, read from the archive file"""
+    if not crud.get_student(db, student_id):
+        raise HTTPException(status_code=404, detail="Estudiante no encontrado")
+    items = archive.get_archived_student_accesses(db, student_id, year, month)
+    if items is None:
+        raise HTTPException(status_code=404, detail="Mes no archivado")
+    return {"year": year, "month": month, "items": items}
 
 @router.get("/plan/{plan_id}")
-def get_plan_report(plan_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
-    report = crud.get_plan_report(db, plan_id)
+def get_plan_report(
+    plan_id: int,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    sort: str = Query("usage", pattern="^(usage|name|start_date)$"),
+    order: str = Query("desc", pattern="^(asc|desc)$"),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    report = crud.get_plan_report(db, plan_id, skip=skip, limit=limit, sort=sort, descending=order == "desc")
     if not report:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
-    return report
\ No newline at end of file
+    return _freshness(request, response, report) or report
+
+@router.get("/plan/{plan_id}/accesses")
+def get_plan_accesses(
+    plan_id: int,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.PLAN_HISTORY_PAGE, ge=1, le=200),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """Accesses under a plan, newest first, plus this month's total"""
+    if not crud.get_plan(db, plan_id):
+        raise HTTPException(status_code=404, detail="Plan no encontrado")
+    try:
+        items, next_cursor = crud.get_plan_accesses(
+            db, plan_id, naive_utc(date_from), naive_utc(date_to), cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    now = datetime.utcnow()
+    return {
+        "items": items,
+        "next_cursor": next_cursor,
+        "monthly_accesses": crud.get_plan_monthly_accesses(db, plan_id, now.month, now.year)
+    }
+
+ACCESS_TOTAL_DEFAULT_DAYS = {"day": 30, "week": 7 * 12, "month": 365}
+
+@router.get("/access-totals")
+def get_access_totals(
+    period: str = Query("day", pattern="^(day|week|month)$"),
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    plan_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """Access totals per day, week or month from the hourly rollup; `to` is exclusive"""
+    if date_to is None:
+        date_to = datetime.utcnow().date() + timedelta(days=1)
+    if date_from is None:
+        date_from = date_to - timedelta(days=ACCESS_TOTAL_DEFAULT_DAYS[period])
+    if date_from >= date_to:
+        raise HTTPException(status_code=400, detail="El rango de fechas no es válido")
+    if (date_to - date_from).days > 366 * 5:
+        raise HTTPException(status_code=400, detail="El rango máximo es de cinco años")
+    
+    buckets = crud.get_access_totals(db, period, date_from, date_to, plan_id)
+    return {
+        "period": period,
+        "from": date_from,
+        "to": date_to,
+        "plan_id": plan_id,
+        "total_accesses": sum(bucket["accesses"] for bucket in buckets),
+        "all_time_accesses": crud.get_total_accesses(db, plan_id),
+        "buckets": buckets
+    }
+
+@router.get("/heatmap")
+def get_access_heatmap(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    plan_id: Optional[int] = None,
+    visit_minutes: int = Query(90, ge=15, le=480),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """
+    Weekday x hour accesses and estimated peak occupancy (weekday 0 is
+    Sunday, hours in UTC); defaults to the last year
+    """
+    if date_to is None:
+        date_to = datetime.utcnow().date() + timedelta(days=1)
+    if date_from is None:
+        date_from = date_to - timedelta(days=365)
+    if date_from >= date_to:
+        raise HTTPException(status_code=400, detail="El rango de fechas no es válido")
+    if (date_to - date_from).days > 366 * 2:
+        raise HTTPException(status_code=400, detail="El rango máximo es de dos años")
+    
+    cells = crud.get_access_heatmap(db, date_from, date_to, plan_id, visit_minutes)
+    busiest = max(cells, key=lambda cell: (cell["peak_occupancy"], cell["accesses"]))
+    return {
+        "from": date_from,
+        "to": date_to,
+        "plan_id": plan_id,
+        "visit_minutes": visit_minutes,
+        "busiest": busiest if busiest["accesses"] else None,
+        "cells": cells
+    }
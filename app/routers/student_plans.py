@@ -1,8 +1,10 @@
 # app/routers/student_plans.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
+from app.conditional import not_modified
 from app.database import get_db
+from app.pagination import set_page_headers
 from app import crud, schemas
 
 router = APIRouter()
@@ -29,10 +31,40 @@ def verify_admin_api(authorization: Optional[str] = Header(None)):
             detail="Invalid token"
         )
 
-@router.get("/", response_model=List[schemas.StudentPlan])
-def read_student_plans(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
-    student_plans = crud.get_student_plans(db, skip=skip, limit=limit)
-    return student_plans
+def _not_modified(request: Request, response: Response, student_plan) -> Optional[Response]:
+    """Validators for one student plan and the student and plan nested in it"""
+    stamps = (student_plan.updated_at, student_plan.student.updated_at, student_plan.plan.updated_at)
+    return not_modified(request, response, (student_plan.id, *stamps), max(stamps))
+
+@router.get("/", response_model=Union[List[schemas.StudentPlan], List[schemas.StudentPlanCompact]])
+def read_student_plans(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    include_total: bool = False,
+    view: str = Query("full", pattern="^(full|compact)$"),
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """
+    One page; the next one is at the X-Next-Cursor / Link header.
+    view=compact returns flat ids and names instead of nested objects.
+    """
+    unchanged = not_modified(request, response, crud.get_student_plans_version(db))
+    if unchanged:
+        return unchanged
+    try:
+        page = crud.get_student_plans(
+            db, skip=skip, limit=limit, cursor=cursor, with_total=include_total, compact=view == "compact"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_page_headers(response, request, page)
+    if view == "compact":
+        return [schemas.StudentPlanCompact.model_validate(row) for row in page.items]
+    return page.items
 
 @router.post("/", response_model=schemas.StudentPlan)
 def create_student_plan(student_plan: schemas.StudentPlanCreate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
@@ -49,11 +81,12 @@ def create_student_plan(student_plan: schemas.StudentPlanCreate, db: Session = D
     return crud.create_student_plan(db=db, student_plan=student_plan)
 
 @router.get("/{student_plan_id}", response_model=schemas.StudentPlan)
-def read_student_plan(student_plan_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
+def read_student_plan(student_plan_id: int, request: Request, response: Response, db: Session = Depends(get_db),
+                      authorized: bool = Depends(verify_admin_api)):
     db_student_plan = crud.get_student_plan(db, student_plan_id=student_plan_id)
     if db_student_plan is None:
         raise HTTPException(status_code=404, detail="Plan de estudiante no encontrado")
-    return db_student_plan
+    return _not_modified(request, response, db_student_plan) or db_student_plan
 
 @router.put("/{student_plan_id}", response_model=schemas.StudentPlan)
 def update_student_plan(student_plan_id: int, student_plan: schemas.StudentPlanUpdate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
@@ -70,8 +103,9 @@ def delete_student_plan(student_plan_id: int, db: Session = Depends(get_db), aut
     return {"message": "Plan de estudiante eliminado exitosamente"}
 
 @router.get("/student/{student_id}/active", response_model=schemas.StudentPlan)
-def get_active_student_plan(student_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
+def get_active_student_plan(student_id: int, request: Request, response: Response, db: Session = Depends(get_db),
+                            authorized: bool = Depends(verify_admin_api)):
     db_student_plan = crud.get_active_student_plan(db, student_id=student_id)
     if db_student_plan is None:
         raise HTTPException(status_code=404, detail="No hay plan activo para este estudiante")
-    return db_student_plan
+    return _not_modified(request, response, db_student_plan) or db_student_plan
@@ -1,10 +1,13 @@
 # app/routers/students.py
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, status, Header, Query, Request, Response, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
+from app.conditional import not_modified
 from app.database import get_db
+from app.pagination import set_page_headers
 from app.auth import verify_token_from_header
-from app import crud, schemas
+from app import crud, schemas, student_import
 
 router = APIRouter()
 
@@ -34,9 +37,36 @@ def verify_admin_api(authorization: Optional[str] = Header(None)):
         )
 
 @router.get("/", response_model=List[schemas.Student])
-def read_students(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
-    students = crud.get_students(db, skip=skip, limit=limit)
-    return students
+def read_students(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    include_total: bool = False,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """One page; the next one is at the X-Next-Cursor / Link header"""
+    unchanged = not_modified(request, response, crud.get_students_version(db))
+    if unchanged:
+        return unchanged
+    try:
+        page = crud.get_students(db, skip=skip, limit=limit, cursor=cursor, with_total=include_total)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    set_page_headers(response, request, page)
+    return page.items
+
+@router.get("/search", response_model=List[schemas.Student])
+def search_students(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(crud.STUDENT_SEARCH_LIMIT, ge=1, le=50),
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """Ranked matches on name (substring) and document (prefix) for autocomplete"""
+    return crud.search_students(db, q, limit)
 
 @router.post("/", response_model=schemas.Student)
 def create_student(student: schemas.StudentCreate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
@@ -45,12 +75,35 @@ def create_student(student: schemas.StudentCreate, db: Session = Depends(get_db)
         raise HTTPException(status_code=400, detail="El documento ya está registrado")
     return crud.create_student(db=db, student=student)
 
+@router.post("/import", response_model=schemas.StudentImportReport)
+def import_students(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    authorized: bool = Depends(verify_admin_api)
+):
+    """
+    Bulk create from a CSV upload (name, document and optionally plan,
+    start_date, end_date). Returns per-row errors; dry_run only validates.
+    """
+    # utf-8-sig drops the BOM spreadsheet exports start with
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return student_import.import_students(db, lines, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar codificado en UTF-8")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        lines.detach()
+
 @router.get("/{student_id}", response_model=schemas.Student)
-def read_student(student_id: int, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
+def read_student(student_id: int, request: Request, response: Response, db: Session = Depends(get_db),
+                 authorized: bool = Depends(verify_admin_api)):
     db_student = crud.get_student(db, student_id=student_id)
     if db_student is None:
         raise HTTPException(status_code=404, detail="Estudiante no encontrado")
-    return db_student
+    return not_modified(request, response, (db_student.updated_at,), db_student.updated_at) or db_student
 
 @router.put("/{student_id}", response_model=schemas.Student)
 def update_student(student_id: int, student: schemas.StudentUpdate, db: Session = Depends(get_db), authorized: bool = Depends(verify_admin_api)):
@@ -1,7 +1,8 @@
 # app/schemas.py
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 from typing import Optional, List
+from app.pagination import naive_utc
 
 # Student schemas
 class StudentBase(BaseModel):
@@ -68,6 +69,21 @@ class StudentPlan(StudentPlanBase):
     class Config:
         from_attributes = True
 
+class StudentPlanCompact(BaseModel):
+    """Flat list row (?view=compact): ids and names instead of nested objects"""
+    id: int
+    student_id: int
+    student_name: str
+    student_document: str
+    plan_id: int
+    plan_name: str
+    start_date: datetime
+    end_date: datetime
+    is_active: bool
+    
+    class Config:
+        from_attributes = True
+
 # AccessLog schemas
 class AccessLogBase(BaseModel):
     student_id: int
@@ -86,6 +102,21 @@ class AccessLog(AccessLogBase):
     class Config:
         from_attributes = True
 
+class AccessLogCompact(BaseModel):
+    """Flat list row (?view=compact): ids and names instead of nested objects"""
+    id: int
+    access_time: datetime
+    notes: Optional[str] = None
+    student_id: int
+    student_name: str
+    student_document: str
+    student_plan_id: int
+    plan_id: int
+    plan_name: str
+    
+    class Config:
+        from_attributes = True
+
 # Auth schemas
 class Token(BaseModel):
     access_token: str
@@ -101,6 +132,46 @@ class UserLogin(BaseModel):
 class StudentAccess(BaseModel):
     document: str
 
+# Buffered kiosk swipes replayed in bulk
+class CheckInEvent(BaseModel):
+    document: str
+    timestamp: datetime
+    kiosk_id: str = Field(..., min_length=1, max_length=50)
+
+    @field_validator("timestamp")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        return naive_utc(value)
+
+class CheckInBatch(BaseModel):
+    events: List[CheckInEvent] = Field(..., min_length=1, max_length=1000)
+
+class CheckInEventResult(BaseModel):
+    index: int
+    document: str
+    timestamp: datetime
+    accepted: bool
+    message: str
+    access_log_id: Optional[int] = None
+    remaining_accesses: int = 0
+
+# Bulk CSV import (app.student_import)
+class ExportLink(BaseModel):
+    url: str
+    expires_in: int
+
+class ImportRowError(BaseModel):
+    line: int
+    document: Optional[str] = None
+    message: str
+
+class StudentImportReport(BaseModel):
+    rows: int = 0
+    created: int = 0
+    plans_assigned: int = 0
+    dry_run: bool = False
+    errors: List[ImportRowError] = []
+
 # Report schemas
 class StudentReport(BaseModel):
     student: Student
@@ -0,0 +1,174 @@
+# app/student_import.py
+# Bulk student onboarding from CSV (POST /api/students/import and
+# `python -m app.cli import-students`). The file is read as a stream and
+# handled in chunks: rows are validated with schemas.StudentCreate, the
+# chunk's documents are checked against the database with one query, and
+# the valid rows go in with one multi-row INSERT per table. Each row is
+# either imported whole (student plus optional plan) or reported with its
+# line number; earlier chunks stay committed if a later one fails. A
+# document registered concurrently, between the check and the INSERT, is
+# reported as a duplicate too.
+import csv
+from datetime import datetime, time
+from typing import Iterable, List, NamedTuple, Optional
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import crud, models, schemas
+
+IMPORT_CHUNK_SIZE = 1000
+REQUIRED_COLUMNS = ("name", "document")
+
+def _parse_date(value: str, end_of_day: bool) -> datetime:
+    """YYYY-MM-DD (whole day, as the admin form sends it) or a full ISO datetime"""
+    parsed = datetime.fromisoformat(value)
+    if len(value) <= 10:
+        parsed = datetime.combine(parsed.date(), time(23, 59, 59) if end_of_day else time.min)
+    return parsed
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc']))}: {item['msg']}" for item in error.errors())
+
+class _Row(NamedTuple):
+    line: int
+    student: schemas.StudentCreate
+    plan_id: Optional[int] = None
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class StudentImporter:
+    """Accumulates the report while chunks are validated and written"""
+
+    def __init__(self, db: Session, plans_by_name: dict, dry_run: bool = False):
+        self.db = db
+        self.plans_by_name = plans_by_name
+        self.dry_run = dry_run
+        self.seen_documents = set()
+        self.report = schemas.StudentImportReport(dry_run=dry_run)
+
+    def _error(self, line: int, message: str, document: Optional[str] = None):
+        self.report.errors.append(schemas.ImportRowError(line=line, document=document or None, message=message))
+
+    def validate(self, line: int, record: dict) -> Optional[_Row]:
+        self.report.rows += 1
+        document = (record.get("document") or "").strip()
+        try:
+            student = schemas.StudentCreate(name=(record.get("name") or "").strip(), document=document)
+        except ValidationError as e:
+            self._error(line, _validation_message(e), document)
+            return None
+        if document in self.seen_documents:
+            self._error(line, "Documento repetido en el archivo", document)
+            return None
+        row = self._with_plan(line, student, record)
+        # Only an accepted row claims the document: after a rejected one,
+        # a corrected line further down is still imported
+        if row is not None:
+            self.seen_documents.add(document)
+        return row
+
+    def _with_plan(self, line: int, student: schemas.StudentCreate, record: dict) -> Optional[_Row]:
+        plan_name = (record.get("plan") or "").strip()
+        if not plan_name:
+            return _Row(line, student)
+        plan_id = self.plans_by_name.get(plan_name.lower())
+        if plan_id is None:
+            self._error(line, f"Plan no encontrado: {plan_name}", student.document)
+            return None
+        try:
+            start_date = _parse_date((record.get("start_date") or "").strip(), end_of_day=False)
+            end_date = _parse_date((record.get("end_date") or "").strip(), end_of_day=True)
+        except ValueError:
+            self._error(line, "Fechas del plan inválidas (se espera YYYY-MM-DD)", student.document)
+            return None
+        if end_date < start_date:
+            self._error(line, "La fecha de fin es anterior a la de inicio", student.document)
+            return None
+        return _Row(line, student, plan_id, start_date, end_date)
+
+    def _registered(self, rows: List[_Row]) -> set:
+        return set(self.db.scalars(
+            select(models.Student.document).where(models.Student.document.in_([row.student.document for row in rows]))
+        ))
+
+    def write(self, rows: List[_Row]):
+        """Drop documents that already exist, then insert the chunk in one transaction"""
+        if not rows:
+            return
+        existing = self._registered(rows)
+        while True:
+            new_rows = [row for row in rows if row.student.document not in existing]
+            if not new_rows or self.dry_run:
+                plans_assigned = sum(1 for row in new_rows if row.plan_id is not None)
+                break
+            try:
+                plans_assigned = self._insert(new_rows)
+                break
+            except IntegrityError:
+                # Another import or a manual create registered some of the
+                # documents after the check: report those, retry the rest
+                self.db.rollback()
+                taken = self._registered(new_rows)
+                if not taken:
+                    raise
+                existing |= taken
+        for row in rows:
+            if row.student.document in existing:
+                self._error(row.line, "El documento ya está registrado", row.student.document)
+        self.report.created += len(new_rows)
+        self.report.plans_assigned += plans_assigned
+
+    def _insert(self, rows: List[_Row]) -> int:
+        """Insert students and their plans and commit; returns the plans assigned"""
+        now = datetime.utcnow()
+        student_ids = self.db.scalars(
+            insert(models.Student).returning(models.Student.id, sort_by_parameter_order=True),
+            [{**row.student.dict(), "created_at": now, "updated_at": now} for row in rows]
+        ).all()
+        student_plans = [
+            {
+                "student_id": student_id, "plan_id": row.plan_id, "start_date": row.start_date,
+                "end_date": row.end_date, "is_active": True, "created_at": now, "updated_at": now
+            }
+            for row, student_id in zip(rows, student_ids) if row.plan_id is not None
+        ]
+        if student_plans:
+            self.db.execute(insert(models.StudentPlan), student_plans)
+        self.db.commit()
+        crud.invalidate_imported_students({values["plan_id"] for values in student_plans})
+        return len(student_plans)
+
+def import_students(db: Session, lines: Iterable[str], dry_run: bool = False,
+                    chunk_size: int = IMPORT_CHUNK_SIZE) -> schemas.StudentImportReport:
+    """
+    Import students from CSV text with a header row: name and document are
+    required; plan (plan name), start_date and end_date optionally assign a
+    plan. Raises ValueError when the header lacks required columns.
+    """
+    reader = csv.DictReader(lines)
+    columns = {(name or "").strip().lower() for name in reader.fieldnames or ()}
+    missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+    if missing:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(missing)}")
+    # Header names are matched case-insensitively
+    reader.fieldnames = [(name or "").strip().lower() for name in reader.fieldnames]
+
+    plans_by_name = {}
+    if "plan" in columns:
+        plans_by_name = {
+            name: plan_id for name, plan_id in db.execute(select(func.lower(models.Plan.name), models.Plan.id))
+        }
+    importer = StudentImporter(db, plans_by_name, dry_run)
+    chunk = []
+    for record in reader:
+        # line_num is the physical line the record ended on (header is line 1)
+        row = importer.validate(reader.line_num, record)
+        if row is not None:
+            chunk.append(row)
+        if len(chunk) >= chunk_size:
+            importer.write(chunk)
+            chunk = []
+    importer.write(chunk)
+    importer.report.errors.sort(key=lambda error: error.line)
+    return importer.report
@@ -0,0 +1,85 @@
+# app/tasks.py
+# Maintenance jobs shared by the in-process scheduler and the CLI
+import asyncio
+import logging
+from datetime import date
+from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from app import archive, crud, schemas, student_import
+from app.config import settings
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+def sweep_expired_plans() -> int:
+    """Deactivate every expired student plan with one bulk UPDATE"""
+    db = SessionLocal()
+    try:
+        changed = crud.deactivate_expired_student_plans(db)
+    finally:
+        db.close()
+    logger.info("Plan sweep deactivated %d expired student plans", changed)
+    return changed
+
+def rebuild_access_stats(since: Optional[date] = None) -> int:
+    """Recompute the hourly access rollup from access_logs"""
+    db = SessionLocal()
+    try:
+        buckets = crud.rebuild_access_stats(db, since)
+    finally:
+        db.close()
+    logger.info("Access stats rebuilt: %d hourly buckets", buckets)
+    return buckets
+
+def maintain_access_log_partitions() -> List[str]:
+    """Keep the upcoming access_logs partitions created"""
+    db = SessionLocal()
+    try:
+        created = crud.ensure_access_log_partitions(db, settings.partition_months_ahead)
+    finally:
+        db.close()
+    if created:
+        logger.info("Created access_logs partitions: %s", ", ".join(created))
+    return created
+
+def detach_access_log_partition(year: int, month: int, drop: bool = False) -> bool:
+    db = SessionLocal()
+    try:
+        detached = crud.detach_access_log_partition(db, year, month, drop)
+    finally:
+        db.close()
+    if detached:
+        logger.info("%s access_logs partition %04d-%02d", "Dropped" if drop else "Detached", year, month)
+    return detached
+
+def archive_access_logs(before: Optional[date] = None) -> list:
+    """Move months older than the archive horizon to cold storage"""
+    db = SessionLocal()
+    try:
+        archived = archive.archive_old_months(db, before)
+    finally:
+        db.close()
+    for year, month, row_count in archived:
+        logger.info("Archived %04d-%02d (%d access logs)", year, month, row_count)
+    return archived
+
+def import_students(path: str, dry_run: bool = False) -> schemas.StudentImportReport:
+    """Bulk create students (and optional plans) from a CSV file"""
+    db = SessionLocal()
+    try:
+        with open(path, encoding="utf-8-sig", newline="") as lines:
+            report = student_import.import_students(db, lines, dry_run=dry_run)
+    finally:
+        db.close()
+    logger.info("Student import from %s: %d rows, %d created, %d errors",
+                path, report.rows, report.created, len(report.errors))
+    return report
+
+async def run_periodically(job, interval_seconds: int):
+    """Run a blocking job in the thread pool every interval_seconds until cancelled"""
+    while True:
+        try:
+            await run_in_threadpool(job)
+        except Exception:
+            logger.exception("Scheduled job %s failed", job.__name__)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,30 @@
+# tests/test_archive.py
+from datetime import datetime
+from app import archive, models
+from app.config import settings
+
+def test_archive_keeps_logs_inserted_after_the_export(db, plan, enroll, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "archive_dir", str(tmp_path))
+    student, student_plan = enroll(plan, "1001")
+    db.add_all([
+        models.AccessLog(student_id=student.id, student_plan_id=student_plan.id, access_time=datetime(2023, 3, day))
+        for day in (1, 15)
+    ])
+    db.commit()
+
+    write_month = archive._write_month
+    def write_then_late_insert(session, year, month, path):
+        exported = write_month(session, year, month, path)
+        # A backdated swipe for the month committed while the file was written
+        late = models.AccessLog(student_id=student.id, student_plan_id=student_plan.id, access_time=datetime(2023, 3, 20))
+        other = type(session)(bind=session.get_bind())
+        other.add(late)
+        other.commit()
+        other.close()
+        return exported
+    monkeypatch.setattr(archive, "_write_month", write_then_late_insert)
+
+    assert archive.archive_month(db, 2023, 3) == 2
+    remaining = db.query(models.AccessLog.access_time).all()
+    assert remaining == [(datetime(2023, 3, 20),)]
+    assert db.get(models.AccessLogArchive, (2023, 3)).row_count == 2
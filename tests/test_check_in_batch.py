@@ -0,0 +1,83 @@
+# tests/test_check_in_batch.py
+from datetime import datetime, timedelta
+from sqlalchemy import event as sqlalchemy_event
+from app import models
+from app.config import settings
+from app.database import engine
+
+def event(document: str, timestamp: datetime) -> dict:
+    return {"document": document, "timestamp": timestamp.isoformat(), "kiosk_id": "kiosco-1"}
+
+def test_batch_rejects_events_outside_replay_window(client, db, plan, enroll):
+    enroll(plan, "1001")
+    now = datetime.utcnow()
+    response = client.post("/api/access-logs/batch", json={"events": [
+        event("1001", now - timedelta(minutes=10)),
+        event("1001", now - timedelta(days=365)),
+        event("1001", now + timedelta(days=2)),
+    ]})
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [result["accepted"] for result in results] == [True, False, False]
+    assert results[1]["message"] == results[2]["message"] == "Fecha del evento fuera del rango permitido"
+    assert db.query(models.AccessLog).count() == 1
+
+def test_batch_requires_kiosk_key_when_configured(client, plan, enroll, monkeypatch):
+    enroll(plan, "1001")
+    monkeypatch.setattr(settings, "kiosk_api_key", "clave-kiosco")
+    batch = {"events": [event("1001", datetime.utcnow())]}
+
+    assert client.post("/api/access-logs/batch", json=batch).status_code == 401
+    response = client.post("/api/access-logs/batch", json=batch, headers={"X-Kiosk-Key": "clave-kiosco"})
+    assert response.status_code == 200
+    assert response.json()[0]["accepted"] is True
+
+def test_batch_rollup_sends_one_row_per_hour_bucket(client, db, plan, enroll):
+    """PostgreSQL rejects a multi-row ON CONFLICT that updates the same bucket twice"""
+    first, _ = enroll(plan, "1001")
+    second, _ = enroll(plan, "1002")
+    enroll(plan, "1003")
+    assert client.post("/api/access-logs/student-access", json={"document": "1003"}).status_code == 200
+    now = datetime.utcnow()
+    bucket_start = now.replace(minute=0, second=0, microsecond=0)
+
+    rollup_params = []
+    def capture(conn, clauseelement, multiparams, params, execution_options):
+        if getattr(getattr(clauseelement, "table", None), "name", None) == models.AccessStatsHourly.__tablename__:
+            rollup_params.extend(multiparams or [params])
+    sqlalchemy_event.listen(engine, "before_execute", capture)
+    try:
+        response = client.post("/api/access-logs/batch", json={"events": [
+            event("1001", bucket_start), event("1002", bucket_start), event("1001", bucket_start),
+            event("1003", bucket_start)
+        ]})
+    finally:
+        sqlalchemy_event.remove(engine, "before_execute", capture)
+
+    assert [result["accepted"] for result in response.json()] == [True] * 4
+    keys = [(params["b_plan_id"], params["b_day"], params["b_hour"]) for params in rollup_params]
+    assert len(keys) == len(set(keys)) == 1
+    stats = db.query(models.AccessStatsHourly).filter_by(
+        plan_id=plan.id, day=bucket_start.date(), hour=bucket_start.hour
+    ).one()
+    # 1003 was already counted by the live check-in
+    assert (stats.access_count, stats.student_count) == (5, 3)
+
+def test_batch_respects_quota_on_an_existing_counter(client, db, enroll):
+    small = models.Plan(name="Dos ingresos", monthly_entries=2)
+    db.add(small)
+    db.commit()
+    _, student_plan = enroll(small, "1001")
+    assert client.post("/api/access-logs/student-access", json={"document": "1001"}).status_code == 200
+    now = datetime.utcnow()
+
+    response = client.post("/api/access-logs/batch", json={"events": [
+        event("1001", now - timedelta(seconds=seconds)) for seconds in (3, 2, 1)
+    ]})
+
+    assert [result["accepted"] for result in response.json()] == [True, False, False]
+    counter = db.query(models.StudentPlanUsage).filter_by(
+        student_plan_id=student_plan.id, year=now.year, month=now.month
+    ).one()
+    assert counter.access_count == 2
@@ -0,0 +1,48 @@
+# tests/test_eager_loading.py
+# Lazy loads raise in this suite (see conftest), so each endpoint below
+# fails if its query stops loading a relationship its serializer needs.
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+from app import models
+from tests.conftest import ADMIN_HEADERS
+
+@pytest.fixture
+def check_ins(client, plan, enroll):
+    """Two students with a plan and one check-in each; returns their ids"""
+    ids = []
+    for document in ("1001", "1002"):
+        student, student_plan = enroll(plan, document)
+        response = client.post("/api/access-logs/student-access", json={"document": document})
+        assert response.status_code == 200
+        ids.append((student.id, student_plan.id, response.json()["access_log"]["id"]))
+    return ids
+
+def test_lazy_loads_raise(db, check_ins):
+    assert models.LAZY == "raise_on_sql"
+    access_log = db.get(models.AccessLog, check_ins[0][2])
+    with pytest.raises(InvalidRequestError):
+        access_log.student
+
+@pytest.mark.parametrize("path", [
+    "/api/students/{student_id}",
+    "/api/plans/{plan_id}",
+    "/api/student-plans/{student_plan_id}",
+    "/api/student-plans/student/{student_id}/active",
+    "/api/student-plans/?view=full",
+    "/api/student-plans/?view=compact",
+    "/api/access-logs/{access_log_id}",
+    "/api/access-logs/?view=full",
+    "/api/access-logs/?view=compact",
+    "/api/reports/student/{student_id}",
+    "/api/reports/student/{student_id}/accesses",
+    "/api/reports/plan/{plan_id}",
+    "/api/reports/plan/{plan_id}/accesses",
+    "/api/reports/dashboard",
+])
+def test_nested_serializers_load_eagerly(client, plan, check_ins, path):
+    student_id, student_plan_id, access_log_id = check_ins[0]
+    url = path.format(
+        student_id=student_id, plan_id=plan.id, student_plan_id=student_plan_id, access_log_id=access_log_id
+    )
+    response = client.get(url, headers=ADMIN_HEADERS)
+    assert response.status_code == 200, response.text
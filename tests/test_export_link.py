@@ -0,0 +1,37 @@
+# tests/test_export_link.py
+from datetime import datetime, timedelta
+from app import models
+from app.auth import create_access_token
+from tests.conftest import ADMIN_HEADERS
+
+def test_export_link_downloads_the_signed_range_without_a_header(client, db, plan, enroll):
+    student, student_plan = enroll(plan, "1001")
+    db.add_all([
+        models.AccessLog(student_id=student.id, student_plan_id=student_plan.id, access_time=datetime(2023, 3, day))
+        for day in (1, 2, 3)
+    ])
+    db.commit()
+    params = {"from": "2023-03-02T00:00:00Z", "to": "2023-03-03T00:00:00Z", "format": "ndjson"}
+    assert client.post("/api/access-logs/export-link", params=params).status_code == 401
+
+    response = client.post("/api/access-logs/export-link", params=params, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    link = response.json()
+    assert link["expires_in"] == 60
+
+    # The signed range wins over parameters added to the URL
+    download = client.get(link["url"], params={"from": "2023-01-01T00:00:00"})
+    assert download.status_code == 200
+    assert download.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="accesos_20230302_20230303.ndjson"' in download.headers["content-disposition"]
+    lines = download.text.splitlines()
+    assert len(lines) == 1 and '"2023-03-02T00:00:00"' in lines[0]
+
+def test_export_link_rejects_expired_and_foreign_tokens(client):
+    expired = create_access_token({"sub": "access-log-export", "format": "csv"}, expires_delta=timedelta(seconds=-1))
+    login_token = create_access_token({"sub": "admin"})
+    for token in (expired, login_token, "no-es-un-token"):
+        response = client.get("/api/access-logs/export", params={"token": token})
+        assert response.status_code == 401
+    assert client.get("/api/access-logs/export").status_code == 401
+    assert client.get("/api/access-logs/export", headers=ADMIN_HEADERS).status_code == 200
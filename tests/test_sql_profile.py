@@ -0,0 +1,8 @@
+# tests/test_sql_profile.py
+from app.config import settings
+from tests.conftest import ADMIN_HEADERS
+
+def test_sql_profile_requires_admin(client, monkeypatch):
+    monkeypatch.setattr(settings, "sql_profiling", True)
+    assert client.get("/debug/sql-profile").status_code == 401
+    assert client.get("/debug/sql-profile", headers=ADMIN_HEADERS).status_code == 200
@@ -0,0 +1,33 @@
+# tests/test_student_import.py
+from app import models, student_import
+from app.database import SessionLocal
+
+def test_import_reports_documents_registered_during_the_chunk(db, monkeypatch):
+    insert = student_import.StudentImporter._insert
+    def register_then_insert(importer, rows):
+        # Created by another request after the chunk's duplicate check
+        other = SessionLocal()
+        other.add(models.Student(name="Creado aparte", document="1002"))
+        other.commit()
+        other.close()
+        monkeypatch.setattr(student_import.StudentImporter, "_insert", insert)
+        return insert(importer, rows)
+    monkeypatch.setattr(student_import.StudentImporter, "_insert", register_then_insert)
+
+    report = student_import.import_students(db, ["name,document", "Ana,1001", "Luis,1002", "Eva,1003"])
+
+    assert report.created == 2
+    assert [(error.line, error.document, error.message) for error in report.errors] == [
+        (3, "1002", "El documento ya está registrado")
+    ]
+    assert sorted(document for (document,) in db.query(models.Student.document)) == ["1001", "1002", "1003"]
+
+def test_rejected_row_does_not_claim_its_document(db, plan):
+    report = student_import.import_students(db, [
+        "name,document,plan,start_date,end_date",
+        "Ana,1001,Inexistente,2024-01-01,2024-01-31",
+        "Ana,1001,Mensual,2024-01-01,2024-01-31",
+    ])
+
+    assert (report.created, report.plans_assigned) == (1, 1)
+    assert [(error.line, error.message) for error in report.errors] == [(2, "Plan no encontrado: Inexistente")]
@@ -0,0 +1,17 @@
+# tests/test_student_search.py
+from app import models
+from tests.conftest import ADMIN_HEADERS
+
+def test_short_terms_match_the_start_of_any_word(client, db):
+    db.add_all([
+        models.Student(name=name, document=document) for name, document in (
+            ("Ana Lopez", "1001"), ("Lorena Diaz", "1002"), ("Carlos Pelo", "1003")
+        )
+    ])
+    db.commit()
+
+    response = client.get("/api/students/search", params={"q": "lo"}, headers=ADMIN_HEADERS)
+
+    assert response.status_code == 200
+    # Name prefix before word start; "Pelo" only contains the term
+    assert [student["name"] for student in response.json()] == ["Lorena Diaz", "Ana Lopez"]